@@ -0,0 +1,88 @@
+"""
+    python -m benchmarks run [-k PATTERN] [-o results.json] [--baseline baseline.json]
+    python -m benchmarks compare results.json baseline.json [--threshold 0.1]
+    python -m benchmarks list
+
+Exits with status 1 when a benchmark regressed past its threshold.
+"""
+from benchmarks import suite
+import argparse
+import sys
+
+
+def _format_time(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def _parse_thresholds(values):
+    thresholds = {}
+    for value in values:
+        name, _, threshold = value.partition("=")
+        if not threshold:
+            raise SystemExit(f"--threshold-for expects NAME=FRACTION, got {value!r}")
+        thresholds[name] = float(threshold)
+    return thresholds
+
+
+def _report(results, baseline, args):
+    rows = suite.compare(results, baseline, args.threshold, _parse_thresholds(args.threshold_for))
+    regressions = 0
+    for name, previous, current, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:32} {_format_time(previous):>10} -> {_format_time(current):>10} {ratio:6.2f}x {flag}")
+        regressions += regressed
+    print(f"{regressions} regression(s) out of {len(rows)} compared benchmarks")
+    return 1 if regressions else 0
+
+
+def _add_threshold_arguments(parser):
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown as a fraction of the baseline (default 0.10)")
+    parser.add_argument("--threshold-for", action="append", default=[], metavar="NAME=FRACTION",
+                        help="threshold override for one benchmark, can be repeated")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="py_bitcoin benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    run.add_argument("-k", "--pattern", help="only run benchmarks whose name matches this regex")
+    run.add_argument("-o", "--output", help="write the results to this JSON file")
+    run.add_argument("--baseline", help="compare against this saved results file")
+    run.add_argument("--seed", type=int, default=0)
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--number", type=int, default=None, help="calls per repeat, calibrated if not given")
+    run.add_argument("--min-time", type=float, default=0.05, help="seconds per repeat when calibrating")
+    _add_threshold_arguments(run)
+
+    compare = commands.add_parser("compare", help="compare two saved results files")
+    compare.add_argument("results")
+    compare.add_argument("baseline")
+    _add_threshold_arguments(compare)
+
+    commands.add_parser("list", help="list the benchmark names")
+
+    args = parser.parse_args(argv)
+    if args.command == "list":
+        print("\n".join(suite.BENCHMARKS))
+        return 0
+    if args.command == "compare":
+        return _report(suite.load(args.results), suite.load(args.baseline), args)
+
+    def progress(name, stats):
+        print(f"{name:32} {_format_time(stats['median']):>10}  (x{stats['number']}, {stats['repeat']} repeats)")
+
+    results = suite.run(args.pattern, args.seed, args.repeat, args.number, args.min_time, progress)
+    if args.output:
+        suite.save(results, args.output)
+    if args.baseline:
+        return _report(results, suite.load(args.baseline), args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
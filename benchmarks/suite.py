@@ -0,0 +1,246 @@
+"""
+Micro / macro benchmarks of the hot paths of the package.
+
+Inputs are drawn from a seeded random.Random so every run times the same work.
+Results are stored as JSON:
+
+    {
+        "format": 1,
+        "seed": 0,
+        "python": "3.11.7",
+        "platform": "...",
+        "benchmarks": {
+            "<name>": {"median": s, "mean": s, "min": s, "stdev": s, "number": n, "repeat": r},
+            ...
+        }
+    }
+
+where every time is in seconds per call.
+"""
+from bitcoin import PrivateKey, S256Field, S256Point, Signature
+from bitcoin.utils import encode_base58_checksum, hash160
+import json
+import platform
+import random
+import re
+import statistics
+import time
+
+FORMAT_VERSION = 1
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Registers a setup function: it receives a seeded Random and returns the callable to time"""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _random_field(rng):
+    return S256Field(rng.randrange(1, S256Field.P))
+
+
+def _random_key(rng):
+    return PrivateKey(rng.randrange(1, S256Point.N))
+
+
+@benchmark("field.add")
+def _field_add(rng):
+    a, b = _random_field(rng), _random_field(rng)
+    return lambda: a + b
+
+
+@benchmark("field.mul")
+def _field_mul(rng):
+    a, b = _random_field(rng), _random_field(rng)
+    return lambda: a * b
+
+
+@benchmark("field.square")
+def _field_square(rng):
+    a = _random_field(rng)
+    return lambda: a ** 2
+
+
+@benchmark("field.div")
+def _field_div(rng):
+    a, b = _random_field(rng), _random_field(rng)
+    return lambda: a / b
+
+
+@benchmark("field.sqrt")
+def _field_sqrt(rng):
+    a = _random_field(rng) ** 2
+    return a.sqrt
+
+
+@benchmark("point.add")
+def _point_add(rng):
+    p, q = _random_key(rng).pub_key, _random_key(rng).pub_key
+    return lambda: p + q
+
+
+@benchmark("point.double")
+def _point_double(rng):
+    p = _random_key(rng).pub_key
+    return lambda: p + p
+
+
+@benchmark("point.rmul")
+def _point_rmul(rng):
+    p = _random_key(rng).pub_key
+    k = rng.randrange(1, S256Point.N)
+    return lambda: k * p
+
+
+@benchmark("key.pub_key")
+def _pub_key(rng):
+    key = _random_key(rng)
+    return lambda: key.pub_key
+
+
+@benchmark("key.sign")
+def _sign(rng):
+    key = _random_key(rng)
+    z = rng.getrandbits(256)
+    return lambda: key.sign(z)
+
+
+@benchmark("key.verify")
+def _verify(rng):
+    key = _random_key(rng)
+    z = rng.getrandbits(256)
+    point, sig = key.pub_key, key.sign(z)
+    return lambda: point.verify(z, sig)
+
+
+@benchmark("sec.parse_compressed")
+def _parse_compressed(rng):
+    sec = _random_key(rng).pub_key.sec(compressed=True)
+    return lambda: S256Point.parse(sec)
+
+
+@benchmark("sec.parse_uncompressed")
+def _parse_uncompressed(rng):
+    sec = _random_key(rng).pub_key.sec(compressed=False)
+    return lambda: S256Point.parse(sec)
+
+
+@benchmark("signature.der")
+def _signature_der(rng):
+    sig = Signature(rng.randrange(1, S256Point.N), rng.randrange(1, S256Point.N))
+    return sig.der
+
+
+@benchmark("signature.parse")
+def _signature_parse(rng):
+    der = Signature(rng.randrange(1, S256Point.N), rng.randrange(1, S256Point.N)).der()
+    return lambda: Signature.parse(der)
+
+
+@benchmark("utils.encode_base58_checksum")
+def _encode_base58_checksum(rng):
+    payload = b"\x00" + rng.randbytes(20)
+    return lambda: encode_base58_checksum(payload)
+
+
+@benchmark("utils.hash160")
+def _hash160(rng):
+    sec = rng.randbytes(33)
+    return lambda: hash160(sec)
+
+
+def _calibrate(func, min_time):
+    """Smallest power of 10 of calls taking at least min_time"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - started >= min_time or number >= 10 ** 7:
+            return number
+        number *= 10
+
+
+def time_benchmark(func, repeat=5, number=None, min_time=0.05) -> dict:
+    """Times func, number calls per repeat, returns seconds per call statistics"""
+    if number is None:
+        number = _calibrate(func, min_time)
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter() - started) / number)
+    return {
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "min": min(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run(pattern=None, seed=0, repeat=5, number=None, min_time=0.05, progress=None) -> dict:
+    """
+    Runs every benchmark whose name matches the regular expression pattern.
+    Each benchmark gets its own Random(seed) so selecting a subset does not change its inputs.
+    """
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if pattern is not None and not re.search(pattern, name):
+            continue
+        func = setup(random.Random(f"{seed}:{name}"))
+        results[name] = time_benchmark(func, repeat=repeat, number=number, min_time=min_time)
+        if progress is not None:
+            progress(name, results[name])
+    return {
+        "format": FORMAT_VERSION,
+        "seed": seed,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "benchmarks": results,
+    }
+
+
+def compare(results, baseline, threshold=0.10, thresholds=None) -> list:
+    """
+    Compares the median of every benchmark present in both results.
+
+    Args:
+        results (dict): current results, as returned by run
+        baseline (dict): saved results to compare against
+        threshold (float): allowed slowdown, 0.10 flags anything over 10% slower
+        thresholds (dict): per benchmark overrides of threshold
+
+    Returns:
+        list: (name, baseline median, current median, ratio, regressed) for every
+        benchmark in both results, ratio being current / baseline
+    """
+    if baseline.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported baseline format {baseline.get('format')}")
+    thresholds = thresholds or {}
+    rows = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            continue
+        ratio = current["median"] / previous["median"]
+        regressed = ratio > 1 + thresholds.get(name, threshold)
+        rows.append((name, previous["median"], current["median"], ratio, regressed))
+    return rows
+
+
+def load(path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(results, path):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -1,4 +1,47 @@
-from .finite_fields import *
-from .private_key import *
-from .secp256k1 import *
-from .transaction import *
\ No newline at end of file
+"""
+Submodules and the classes re-exported here are imported on first access
+(PEP 562), so `import bitcoin` alone does not load the whole package.
+"""
+import importlib
+
+_EXPORTS = {
+    "FieldElement": "finite_fields",
+    "S256Field": "finite_fields",
+    "Point": "secp256k1",
+    "S256Point": "secp256k1",
+    "PrivateKey": "private_key",
+    "Signature": "private_key",
+    "encode_base58_checksum": "utils",
+    "hash160": "utils",
+}
+
+_SUBMODULES = (
+    "block",
+    "compact_filter",
+    "finite_fields",
+    "metrics",
+    "network",
+    "precompute",
+    "private_key",
+    "secp256k1",
+    "service",
+    "transaction",
+    "utils",
+    "watchset",
+)
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | set(_SUBMODULES))
@@ -0,0 +1,266 @@
+from .utils import hash256, little_endian_to_int
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import mmap
+import struct
+import time
+
+HEADER_SIZE = 80
+TWO_WEEKS = 60 * 60 * 24 * 14
+RETARGET_INTERVAL = 2016
+# highest target allowed on mainnet (bits 0x1d00ffff), and on regtest (bits 0x207fffff)
+MAX_TARGET = 0xffff * 256 ** (0x1d - 3)
+REGTEST_MAX_TARGET = 0x7fffff * 256 ** (0x20 - 3)
+
+_HEADER = struct.Struct("<L32s32sLLL")
+_TIME_AND_BITS = struct.Struct("<68xLL4x")
+
+
+def bits_to_target(bits: int) -> int:
+    """Expands the compact bits representation of a target"""
+    exponent = bits >> 24
+    coefficient = bits & 0x007fffff
+    if bits & 0x00800000 and coefficient:
+        raise ValueError(f"Bits {bits:08x} encode a negative target")
+    if exponent <= 3:
+        return coefficient >> (8 * (3 - exponent))
+    return coefficient << (8 * (exponent - 3))
+
+
+def target_to_bits(target: int) -> int:
+    """Compact representation of a target, rounded down like Bitcoin Core's GetCompact"""
+    size = (target.bit_length() + 7) // 8
+    if size <= 3:
+        coefficient = target << (8 * (3 - size))
+    else:
+        coefficient = target >> (8 * (size - 3))
+    # the coefficient is signed: move a set high bit into an extra byte
+    if coefficient & 0x00800000:
+        coefficient >>= 8
+        size += 1
+    return size << 24 | coefficient
+
+
+def calculate_new_bits(prev_bits: int, time_differential: int, max_target: int = MAX_TARGET) -> int:
+    """
+    Bits of the first block of a difficulty period.
+
+    Args:
+        prev_bits (int): bits of the last block of the previous period
+        time_differential (int): seconds between the first and the last block of the previous period
+        max_target (int): highest target allowed on the network
+
+    Returns:
+        int: the new bits
+    """
+    time_differential = max(TWO_WEEKS // 4, min(time_differential, TWO_WEEKS * 4))
+    new_target = bits_to_target(prev_bits) * time_differential // TWO_WEEKS
+    return target_to_bits(min(new_target, max_target))
+
+
+class BlockHeader:
+    """
+    80 byte block header. prev_block, merkle_root and hash() are in the usual
+    big endian display order, the reverse of the serialization.
+    """
+    def __init__(self, version, prev_block, merkle_root, timestamp, bits, nonce):
+        self.version = version
+        self.prev_block = prev_block
+        self.merkle_root = merkle_root
+        self.timestamp = timestamp
+        self.bits = bits
+        self.nonce = nonce
+
+    def __repr__(self):
+        return f"BlockHeader({self.hash().hex()})"
+
+    @classmethod
+    def parse(cls, b, offset: int = 0):
+        """Parses the header starting at offset of any bytes-like object"""
+        if len(b) - offset < HEADER_SIZE:
+            raise ValueError("Block header must be 80 bytes")
+        version, prev_block, merkle_root, timestamp, bits, nonce = _HEADER.unpack_from(b, offset)
+        return cls(version, prev_block[::-1], merkle_root[::-1], timestamp, bits, nonce)
+
+    def serialize(self) -> bytes:
+        return _HEADER.pack(
+            self.version,
+            self.prev_block[::-1],
+            self.merkle_root[::-1],
+            self.timestamp,
+            self.bits,
+            self.nonce,
+        )
+
+    def hash(self) -> bytes:
+        return hash256(self.serialize())[::-1]
+
+    def target(self) -> int:
+        return bits_to_target(self.bits)
+
+    def difficulty(self) -> float:
+        return MAX_TARGET / self.target()
+
+    def check_pow(self) -> bool:
+        return little_endian_to_int(hash256(self.serialize())) <= self.target()
+
+
+class HeaderChainReport:
+    def __init__(self, count, tip, elapsed):
+        self.count = count
+        self.tip = tip
+        self.elapsed = elapsed
+
+    @property
+    def headers_per_second(self) -> float:
+        return self.count / self.elapsed if self.elapsed > 0 else float("inf")
+
+    def __repr__(self):
+        return (f"HeaderChainReport({self.count} headers, tip {self.tip.hex()}, "
+                f"{self.elapsed:.2f}s, {self.headers_per_second:.0f} headers/s)")
+
+
+def _check_chunk(path, start, count, max_target):
+    """
+    Hashes `count` headers of the file starting at header index `start`, checking
+    proof-of-work and linkage inside the chunk.
+
+    Returns:
+        tuple: (prev_block of the first header, hash of the last header, error)
+        with hashes in serialization (little endian) order, and error either None
+        or the (index, reason) of the first invalid header.
+    """
+    targets = {}
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        view = memoryview(data)
+        header = None
+        try:
+            offset = start * HEADER_SIZE
+            first_prev = bytes(view[offset + 4:offset + 36])
+            prev_hash = first_prev
+            for height in range(start, start + count):
+                header = view[offset:offset + HEADER_SIZE]
+                if header[4:36] != prev_hash:
+                    return first_prev, None, (height, "does not extend the previous header")
+                bits = little_endian_to_int(header[72:76])
+                target = targets.get(bits)
+                if target is None:
+                    target = targets[bits] = bits_to_target(bits)
+                    if target > max_target:
+                        return first_prev, None, (height, "has a target above the proof-of-work limit")
+                prev_hash = hash256(header)
+                if little_endian_to_int(prev_hash) > target:
+                    return first_prev, None, (height, "does not satisfy its proof-of-work")
+                offset += HEADER_SIZE
+            return first_prev, prev_hash, None
+        finally:
+            del header
+            view.release()
+
+
+def _check_retargets(data, start_height, max_target):
+    timestamps = []
+    all_bits = []
+    for timestamp, bits in _TIME_AND_BITS.iter_unpack(data):
+        timestamps.append(timestamp)
+        all_bits.append(bits)
+    for i in range(1, len(all_bits)):
+        height = start_height + i
+        if height % RETARGET_INTERVAL:
+            expected = all_bits[i - 1]
+        elif i >= RETARGET_INTERVAL:
+            time_differential = timestamps[i - 1] - timestamps[i - RETARGET_INTERVAL]
+            expected = calculate_new_bits(all_bits[i - 1], time_differential, max_target)
+        else:
+            # first block of the period is before the start of the file
+            continue
+        if all_bits[i] != expected:
+            raise ValueError(f"Header {height} has bits {all_bits[i]:08x}, expected {expected:08x}")
+
+
+def validate_header_file(
+    path,
+    processes=None,
+    chunk_size=50000,
+    start_height=0,
+    prev_block=b"\x00" * 32,
+    check_retarget=True,
+    max_target=MAX_TARGET,
+) -> HeaderChainReport:
+    """
+    Validates a file of consecutive raw 80 byte headers: proof-of-work,
+    prev-block linkage and difficulty retargeting (mainnet rules).
+
+    The file is memory-mapped and hashed in chunks of `chunk_size` headers,
+    spread over `processes` worker processes when given.
+
+    Args:
+        path (str): headers file, the first header being at start_height
+        processes (int): worker processes, hashes in this process if None
+        chunk_size (int): headers per chunk handed to a worker
+        start_height (int): height of the first header in the file
+        prev_block (bytes): expected prev_block of the first header (display order),
+            None to skip the check
+        check_retarget (bool): check the bits of every header, disable for testnet
+            and regtest whose difficulty rules differ
+        max_target (int): proof-of-work limit of the network
+
+    Returns:
+        HeaderChainReport: number of headers, tip hash and timing
+
+    Raises:
+        ValueError: on the first invalid header found
+    """
+    started = time.perf_counter()
+    with open(path, "rb") as f:
+        size = f.seek(0, 2)
+        if size % HEADER_SIZE:
+            raise ValueError(f"{path} is not a whole number of {HEADER_SIZE} byte headers")
+        if size == 0:
+            raise ValueError(f"{path} contains no headers")
+        count = size // HEADER_SIZE
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if check_retarget:
+                _check_retargets(data, start_height, max_target)
+
+    starts = list(range(0, count, chunk_size))
+    counts = [min(chunk_size, count - start) for start in starts]
+    arguments = ([path] * len(starts), starts, counts, [max_target] * len(starts))
+    if processes is not None and processes > 1 and len(starts) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            chunks = list(pool.map(_check_chunk, *arguments))
+    else:
+        chunks = list(map(_check_chunk, *arguments))
+
+    expected_prev = prev_block[::-1] if prev_block is not None else None
+    for start, (first_prev, last_hash, error) in zip(starts, chunks):
+        if expected_prev is not None and first_prev != expected_prev:
+            raise ValueError(f"Header {start_height + start} does not extend the previous header")
+        if error is not None:
+            index, reason = error
+            raise ValueError(f"Header {start_height + index} {reason}")
+        expected_prev = last_hash
+    return HeaderChainReport(count, expected_prev[::-1], time.perf_counter() - started)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate a file of raw block headers")
+    parser.add_argument("path")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--start-height", type=int, default=0)
+    parser.add_argument("--no-retarget", action="store_true", help="skip the difficulty retarget checks")
+    args = parser.parse_args(argv)
+    report = validate_header_file(
+        args.path,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        start_height=args.start_height,
+        prev_block=b"\x00" * 32 if args.start_height == 0 else None,
+        check_retarget=not args.no_retarget,
+    )
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+from .utils import encode_varint, hash256, parse_varint, siphash, siphash_key
+
+# parameters of the BIP158 basic filter
+BASIC_FILTER_P = 19
+BASIC_FILTER_M = 784931
+
+OP_RETURN = 0x6a
+
+
+def _golomb_rice_encode(values, p):
+    """
+    Golomb-Rice codes of the differences between consecutive sorted values:
+    the quotient in unary (q ones and a zero) then the p bit remainder, most
+    significant bit first. The output bytearray is sized up front.
+    """
+    total_bits = 0
+    previous = 0
+    for value in values:
+        total_bits += ((value - previous) >> p) + 1 + p
+        previous = value
+    out = bytearray((total_bits + 7) // 8)
+
+    position = 0
+    acc = 0
+    pending = 0
+    previous = 0
+    mask = (1 << p) - 1
+    for value in values:
+        delta = value - previous
+        previous = value
+        quotient = delta >> p
+        acc = (acc << (quotient + 1)) | ((1 << (quotient + 1)) - 2)
+        acc = (acc << p) | (delta & mask)
+        pending += quotient + 1 + p
+        # flush whole 64 bit words to the output
+        while pending >= 64:
+            pending -= 64
+            out[position:position + 8] = (acc >> pending).to_bytes(8, "big")
+            acc &= (1 << pending) - 1
+            position += 8
+    if pending:
+        length = (pending + 7) // 8
+        out[position:position + length] = (acc << (length * 8 - pending)).to_bytes(length, "big")
+    return out
+
+
+def _golomb_rice_decode(data, n, p):
+    """
+    Yields the n sorted values encoded in data by _golomb_rice_encode.
+    Raises ValueError if data ends before n values are decoded.
+    """
+    limit = len(data) * 8
+    # pad so the remainder window never runs past the end
+    window = (p + 7) // 8 + 1
+    data = bytes(data) + b"\x00" * window
+    shift_base = window * 8 - p
+    mask = (1 << p) - 1
+    position = 0
+    value = 0
+    for _ in range(n):
+        quotient = 0
+        while True:
+            if position >= limit:
+                raise ValueError("Truncated Golomb-Rice data")
+            offset = position & 7
+            # leading ones of the bits left in the current byte
+            ones = 8 - (((data[position >> 3] << offset) & 0xff) ^ 0xff).bit_length()
+            if ones < 8 - offset:
+                quotient += ones
+                position += ones + 1
+                break
+            quotient += ones
+            position += ones
+        if position + p > limit:
+            raise ValueError("Truncated Golomb-Rice data")
+        index = position >> 3
+        remainder = int.from_bytes(data[index:index + window], "big") >> (shift_base - (position & 7)) & mask
+        position += p
+        value += (quotient << p) | remainder
+        yield value
+
+
+class GCSFilter:
+    """
+    Golomb-coded set (BIP158). Items are hashed with SipHash keyed by `key`
+    into the range [0, n * m), and the sorted hashes are Golomb-Rice coded.
+    """
+    def __init__(self, n, data, key, p=BASIC_FILTER_P, m=BASIC_FILTER_M):
+        self.n = n
+        self.data = bytes(data)
+        self.key = key
+        self.p = p
+        self.m = m
+
+    def __repr__(self):
+        return f"GCSFilter(n={self.n}, {len(self.data)} bytes)"
+
+    def _hash_items(self, items):
+        """Sorted hashes of the items, keeping values shared by different items"""
+        f = self.n * self.m
+        key = siphash_key(self.key)
+        return sorted(siphash(key, item) * f >> 64 for item in items)
+
+    @classmethod
+    def build(cls, key, items, p=BASIC_FILTER_P, m=BASIC_FILTER_M):
+        """
+        Args:
+            key (bytes): 16 byte SipHash key
+            items (iterable): bytes-like items, duplicates are counted once.
+                Distinct items hashing to the same value are all encoded
+                (as zero deltas), like BIP158 and Bitcoin Core do.
+        """
+        items = set(bytes(item) for item in items)
+        result = cls(len(items), b"", key, p, m)
+        result.data = bytes(_golomb_rice_encode(result._hash_items(items), p))
+        return result
+
+    @classmethod
+    def parse(cls, serialized, key, p=BASIC_FILTER_P, m=BASIC_FILTER_M):
+        """Parses the serialization: item count as a varint followed by the coded data"""
+        n, offset = parse_varint(serialized)
+        return cls(n, serialized[offset:], key, p, m)
+
+    def serialize(self) -> bytes:
+        return encode_varint(self.n) + self.data
+
+    def hash(self) -> bytes:
+        return hash256(self.serialize())
+
+    def header(self, prev_header: bytes = b"\x00" * 32) -> bytes:
+        """Filter header chaining this filter to the previous block's filter header"""
+        return hash256(self.hash() + prev_header)
+
+    def hashes(self) -> list:
+        """The decoded sorted item hashes"""
+        return list(_golomb_rice_decode(self.data, self.n, self.p))
+
+    def match(self, item) -> bool:
+        return self.match_any([item])
+
+    def match_any(self, items) -> bool:
+        """
+        True if any of the items is probably in the filter (false positive rate 1/m).
+        The queries are hashed and sorted once, then merge-walked against the
+        filter while it is decoded, stopping at the first match.
+        """
+        if self.n == 0:
+            return False
+        queries = sorted(set(self._hash_items(items)))
+        if not queries:
+            return False
+        index = 0
+        for value in _golomb_rice_decode(self.data, self.n, self.p):
+            while queries[index] < value:
+                index += 1
+                if index == len(queries):
+                    return False
+            if queries[index] == value:
+                return True
+        return False
+
+
+def filter_key(block_hash: bytes) -> bytes:
+    """SipHash key of a block's filter: first 16 bytes of the block hash in serialization order"""
+    return block_hash[::-1][:16]
+
+
+def build_basic_filter(block_hash: bytes, scripts) -> GCSFilter:
+    """
+    BIP158 basic filter of a block.
+
+    Args:
+        block_hash (bytes): block hash in display order, as returned by BlockHeader.hash()
+        scripts (iterable): the scriptPubKeys of every output created in the block and
+            of every output it spends, as raw script bytes
+
+    Returns:
+        GCSFilter: empty and OP_RETURN scripts are left out
+    """
+    items = [script for script in scripts if len(script) and script[0] != OP_RETURN]
+    return GCSFilter.build(filter_key(block_hash), items)
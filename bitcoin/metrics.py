@@ -0,0 +1,223 @@
+"""
+Opt-in operation counters and call timings for the field and curve arithmetic.
+
+    from bitcoin import metrics
+
+    with metrics.collect() as m:
+        point.verify(z, sig)
+    print(m.to_dict())
+    print(m.to_prometheus())
+
+Instrumented methods are only swapped in while at least one collect() block
+is active, and the originals are put back when the last one exits: outside
+of collect() nothing is counted and nothing is checked.
+"""
+from .finite_fields import FieldElement
+from .private_key import PrivateKey, Signature
+from .secp256k1 import Point, S256Point
+from . import private_key, secp256k1
+from contextlib import contextmanager
+import functools
+import threading
+import time
+
+COUNTERS = (
+    "field_mul",
+    "field_square",
+    "field_pow",
+    "field_inversion",
+    "field_sqrt",
+    "scalar_inversion",
+    "batch_inversion",
+    "batch_inverted_values",
+    "point_add",
+    "point_double",
+    "point_check",
+)
+
+_active = []
+_originals = []
+_lock = threading.Lock()
+
+
+class Metrics:
+    """Counters and per call timings gathered by collect()"""
+    def __init__(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timings = {}
+
+    def __repr__(self):
+        return f"Metrics({self.to_dict()})"
+
+    def reset(self):
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.timings = {}
+
+    def _time(self, name, elapsed):
+        timing = self.timings.get(name)
+        if timing is None:
+            timing = self.timings[name] = {"count": 0, "total": 0.0, "max": 0.0}
+        timing["count"] += 1
+        timing["total"] += elapsed
+        timing["max"] = max(timing["max"], elapsed)
+
+    def to_dict(self) -> dict:
+        return {
+            "counters": dict(self.counters),
+            "timings": {name: dict(timing) for name, timing in self.timings.items()},
+        }
+
+    def to_prometheus(self, prefix="py_bitcoin") -> str:
+        """Counters and timings in the Prometheus text exposition format"""
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        if self.timings:
+            metric = f"{prefix}_call_duration_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for name, timing in sorted(self.timings.items()):
+                lines.append(f'{metric}_sum{{call="{name}"}} {timing["total"]!r}')
+                lines.append(f'{metric}_count{{call="{name}"}} {timing["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def _count(name, amount=1):
+    for metrics in _active:
+        metrics.counters[name] += amount
+
+
+def _wrap_pow(original):
+    @functools.wraps(original)
+    def __pow__(self, power, modulo=None):
+        if power == 2:
+            _count("field_square")
+        elif power == -1 or power == self.prime - 2:
+            _count("field_inversion")
+        elif power == (self.prime + 1) // 4:
+            # the exponent sqrt uses for primes = 3 mod 4, like the secp256k1 prime
+            _count("field_sqrt")
+        else:
+            _count("field_pow")
+        return original(self, power, modulo)
+    return __pow__
+
+
+def _wrap_counter(original, name):
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        _count(name)
+        return original(*args, **kwargs)
+    return wrapper
+
+
+def _wrap_add(original):
+    @functools.wraps(original)
+    def __add__(self, other):
+        if type(other) is type(self) and self.x is not None and self.x == other.x and self.y == other.y:
+            _count("point_double")
+        else:
+            _count("point_add")
+        return original(self, other)
+    return __add__
+
+
+def _wrap_init(original):
+    @functools.wraps(original)
+    def __init__(self, x, y, *args, **kwargs):
+        if x is not None or y is not None:
+            _count("point_check")
+        return original(self, x, y, *args, **kwargs)
+    return __init__
+
+
+def _wrap_batch_inverse(original):
+    @functools.wraps(original)
+    def batch_inverse(values, modulus):
+        _count("batch_inversion")
+        _count("batch_inverted_values", len(values))
+        return original(values, modulus)
+    return batch_inverse
+
+
+def _wrap_additions(original):
+    @functools.wraps(original)
+    def _count_additions(count):
+        _count("point_add", count)
+        return original(count)
+    return _count_additions
+
+
+def _wrap_timer(original, name):
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            for metrics in _active:
+                metrics._time(name, elapsed)
+    return wrapper
+
+
+def _patch(owner, name, make_wrapper):
+    original = owner.__dict__[name]
+    if isinstance(original, classmethod):
+        patched = classmethod(make_wrapper(original.__func__))
+    else:
+        patched = make_wrapper(original)
+    _originals.append((owner, name, original))
+    setattr(owner, name, patched)
+
+
+def _install():
+    _patch(FieldElement, "__mul__", lambda f: _wrap_counter(f, "field_mul"))
+    _patch(FieldElement, "__rmul__", lambda f: _wrap_counter(f, "field_mul"))
+    _patch(FieldElement, "__pow__", _wrap_pow)
+    _patch(Point, "__add__", _wrap_add)
+    _patch(Point, "__init__", _wrap_init)
+    _patch(secp256k1, "batch_inverse", _wrap_batch_inverse)
+    _patch(private_key, "batch_inverse", _wrap_batch_inverse)
+    # scalar inversions modulo N and the integer additions of base_mul_many
+    _patch(secp256k1, "inverse", lambda f: _wrap_counter(f, "scalar_inversion"))
+    _patch(private_key, "inverse", lambda f: _wrap_counter(f, "scalar_inversion"))
+    _patch(secp256k1, "_count_additions", _wrap_additions)
+    _patch(PrivateKey, "sign", lambda f: _wrap_timer(f, "PrivateKey.sign"))
+    _patch(PrivateKey, "sign_many", lambda f: _wrap_timer(f, "PrivateKey.sign_many"))
+    _patch(S256Point, "verify", lambda f: _wrap_timer(f, "S256Point.verify"))
+    _patch(S256Point, "parse", lambda f: _wrap_timer(f, "S256Point.parse"))
+    _patch(Signature, "parse", lambda f: _wrap_timer(f, "Signature.parse"))
+
+
+def _uninstall():
+    while _originals:
+        owner, name, original = _originals.pop()
+        setattr(owner, name, original)
+
+
+@contextmanager
+def collect(metrics: Metrics = None):
+    """
+    Counts field and point operations and times sign/verify/parse calls for the
+    duration of the block. Blocks may be nested or run from several threads:
+    every active Metrics sees every operation.
+
+    Args:
+        metrics (Metrics): accumulate into this instance instead of a new one
+
+    Yields:
+        Metrics: the collected counters and timings
+    """
+    metrics = Metrics() if metrics is None else metrics
+    with _lock:
+        if not _active:
+            _install()
+        _active.append(metrics)
+    try:
+        yield metrics
+    finally:
+        with _lock:
+            _active.remove(metrics)
+            if not _active:
+                _uninstall()
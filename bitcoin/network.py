@@ -0,0 +1,477 @@
+from .block import HEADER_SIZE as BLOCK_HEADER_SIZE, BlockHeader
+from .utils import encode_varint, hash256, int_to_little_endian, little_endian_to_int, parse_varint
+import asyncio
+import random
+import struct
+import time
+
+MAINNET_MAGIC = b"\xf9\xbe\xb4\xd9"
+TESTNET_MAGIC = b"\x0b\x11\x09\x07"
+REGTEST_MAGIC = b"\xfa\xbf\xb5\xda"
+
+HEADER_SIZE = 24
+MAX_PAYLOAD_SIZE = 32 * 1024 * 1024
+PROTOCOL_VERSION = 70015
+
+MSG_TX = 1
+MSG_BLOCK = 2
+MSG_FILTERED_BLOCK = 3
+MSG_WITNESS_TX = 0x40000001
+MSG_WITNESS_BLOCK = 0x40000002
+
+_HEADER = struct.Struct("<4s12sI4s")
+_INVENTORY_ITEM_SIZE = 36
+
+
+class NetworkEnvelope:
+    """
+    A network message: magic | command (12 bytes, null padded) | payload length
+    | checksum (first 4 bytes of hash256(payload)) | payload
+    """
+    def __init__(self, command: bytes, payload: bytes, magic: bytes = MAINNET_MAGIC):
+        self.command = command
+        self.payload = payload
+        self.magic = magic
+
+    def __repr__(self):
+        return f"NetworkEnvelope({self.command.decode('ascii')}, {len(self.payload)} bytes)"
+
+    def serialize(self) -> bytes:
+        return _HEADER.pack(
+            self.magic,
+            self.command,
+            len(self.payload),
+            hash256(self.payload)[:4],
+        ) + bytes(self.payload)
+
+    @classmethod
+    def parse(cls, data, magic: bytes = None):
+        """Parses a complete serialized message, the payload is a memoryview into data"""
+        view = memoryview(data)
+        if len(view) < HEADER_SIZE:
+            raise ValueError("Message shorter than the envelope header")
+        envelope_magic, command, length, checksum = _HEADER.unpack_from(view)
+        payload = view[HEADER_SIZE:HEADER_SIZE + length]
+        if len(payload) != length:
+            raise ValueError("Truncated message payload")
+        return cls._build(envelope_magic, command, payload, checksum, magic)
+
+    @classmethod
+    async def read(cls, reader, magic: bytes = None):
+        """
+        Reads the next message from an asyncio.StreamReader.
+        The payload is a memoryview over the received buffer, so messages can
+        slice it while parsing without copying.
+        """
+        header = await reader.readexactly(HEADER_SIZE)
+        envelope_magic, command, length, checksum = _HEADER.unpack(header)
+        if length > MAX_PAYLOAD_SIZE:
+            raise ValueError(f"Payload of {length} bytes exceeds the maximum message size")
+        payload = memoryview(await reader.readexactly(length))
+        return cls._build(envelope_magic, command, payload, checksum, magic)
+
+    @classmethod
+    def _build(cls, envelope_magic, command, payload, checksum, magic):
+        if magic is not None and envelope_magic != magic:
+            raise ValueError(f"Unexpected network magic {envelope_magic.hex()}")
+        if hash256(payload)[:4] != checksum:
+            raise ValueError("Message checksum does not match its payload")
+        return cls(command.rstrip(b"\x00"), payload, envelope_magic)
+
+
+class VersionMessage:
+    command = b"version"
+
+    def __init__(
+        self,
+        version=PROTOCOL_VERSION,
+        services=0,
+        timestamp=None,
+        receiver_services=0,
+        receiver_ip=b"\x00\x00\x00\x00",
+        receiver_port=8333,
+        sender_services=0,
+        sender_ip=b"\x00\x00\x00\x00",
+        sender_port=8333,
+        nonce=None,
+        user_agent=b"/py_bitcoin:0.1/",
+        latest_block=0,
+        relay=False,
+    ):
+        self.version = version
+        self.services = services
+        self.timestamp = int(time.time()) if timestamp is None else timestamp
+        self.receiver_services = receiver_services
+        self.receiver_ip = receiver_ip
+        self.receiver_port = receiver_port
+        self.sender_services = sender_services
+        self.sender_ip = sender_ip
+        self.sender_port = sender_port
+        self.nonce = random.getrandbits(64) if nonce is None else nonce
+        self.user_agent = user_agent
+        self.latest_block = latest_block
+        self.relay = relay
+
+    @staticmethod
+    def _address(services, ip, port):
+        # IPv4 addresses are sent as IPv4-mapped IPv6 addresses
+        if len(ip) == 4:
+            ip = b"\x00" * 10 + b"\xff\xff" + ip
+        return int_to_little_endian(services, 8) + ip + port.to_bytes(2, "big")
+
+    def serialize(self) -> bytes:
+        result = int_to_little_endian(self.version, 4)
+        result += int_to_little_endian(self.services, 8)
+        result += int_to_little_endian(self.timestamp, 8)
+        result += self._address(self.receiver_services, self.receiver_ip, self.receiver_port)
+        result += self._address(self.sender_services, self.sender_ip, self.sender_port)
+        result += int_to_little_endian(self.nonce, 8)
+        result += encode_varint(len(self.user_agent)) + self.user_agent
+        result += int_to_little_endian(self.latest_block, 4)
+        result += b"\x01" if self.relay else b"\x00"
+        return result
+
+    @classmethod
+    def parse(cls, payload):
+        view = memoryview(payload)
+
+        def ip(raw):
+            raw = bytes(raw)
+            return raw[12:] if raw[:12] == b"\x00" * 10 + b"\xff\xff" else raw
+
+        if len(view) < 80:
+            raise ValueError("Truncated version message")
+        user_agent_length, offset = parse_varint(view, 80)
+        if offset + user_agent_length + 4 > len(view):
+            raise ValueError("Truncated version message")
+        user_agent = bytes(view[offset:offset + user_agent_length])
+        offset += user_agent_length
+        return cls(
+            version=little_endian_to_int(view[0:4]),
+            services=little_endian_to_int(view[4:12]),
+            timestamp=little_endian_to_int(view[12:20]),
+            receiver_services=little_endian_to_int(view[20:28]),
+            receiver_ip=ip(view[28:44]),
+            receiver_port=int.from_bytes(view[44:46], "big"),
+            sender_services=little_endian_to_int(view[46:54]),
+            sender_ip=ip(view[54:70]),
+            sender_port=int.from_bytes(view[70:72], "big"),
+            nonce=little_endian_to_int(view[72:80]),
+            user_agent=user_agent,
+            latest_block=little_endian_to_int(view[offset:offset + 4]),
+            relay=len(view) > offset + 4 and view[offset + 4] == 1,
+        )
+
+
+class VerAckMessage:
+    command = b"verack"
+
+    def serialize(self) -> bytes:
+        return b""
+
+    @classmethod
+    def parse(cls, payload):
+        return cls()
+
+
+class PingMessage:
+    command = b"ping"
+
+    def __init__(self, nonce=None):
+        self.nonce = random.getrandbits(64) if nonce is None else nonce
+
+    def serialize(self) -> bytes:
+        return int_to_little_endian(self.nonce, 8)
+
+    @classmethod
+    def parse(cls, payload):
+        if len(payload) < 8:
+            raise ValueError(f"Truncated {cls.command.decode()} message")
+        return cls(little_endian_to_int(payload[:8]))
+
+
+class PongMessage(PingMessage):
+    command = b"pong"
+
+
+class InvMessage:
+    """
+    List of inventory vectors: (type, hash) with hash in the little endian
+    byte order used on the wire.
+    """
+    command = b"inv"
+
+    def __init__(self, items=None):
+        self.items = list(items) if items is not None else []
+
+    def add(self, inv_type, identifier):
+        self.items.append((inv_type, identifier))
+
+    def serialize(self) -> bytes:
+        result = bytearray(encode_varint(len(self.items)))
+        for inv_type, identifier in self.items:
+            result += int_to_little_endian(inv_type, 4)
+            result += identifier
+        return bytes(result)
+
+    @classmethod
+    def parse(cls, payload):
+        view = memoryview(payload)
+        count, offset = parse_varint(view)
+        if offset + count * _INVENTORY_ITEM_SIZE > len(view):
+            raise ValueError("Truncated inventory list")
+        items = []
+        for _ in range(count):
+            items.append((little_endian_to_int(view[offset:offset + 4]), bytes(view[offset + 4:offset + 36])))
+            offset += _INVENTORY_ITEM_SIZE
+        return cls(items)
+
+
+class GetDataMessage(InvMessage):
+    command = b"getdata"
+
+
+class NotFoundMessage(InvMessage):
+    command = b"notfound"
+
+
+class GetHeadersMessage:
+    """
+    Requests the headers following the first block of the locator found in the
+    receiver's chain, up to end_block (all zeros for as many as possible, 2000 max).
+    Block hashes are in the little endian byte order used on the wire.
+    """
+    command = b"getheaders"
+
+    def __init__(self, version=PROTOCOL_VERSION, locator=None, end_block=None):
+        self.version = version
+        self.locator = list(locator) if locator is not None else [b"\x00" * 32]
+        self.end_block = b"\x00" * 32 if end_block is None else end_block
+
+    def serialize(self) -> bytes:
+        result = int_to_little_endian(self.version, 4)
+        result += encode_varint(len(self.locator))
+        result += b"".join(self.locator)
+        result += self.end_block
+        return result
+
+    @classmethod
+    def parse(cls, payload):
+        view = memoryview(payload)
+        if len(view) < 4:
+            raise ValueError("Truncated getheaders message")
+        count, offset = parse_varint(view, 4)
+        if offset + 32 * (count + 1) > len(view):
+            raise ValueError("Truncated getheaders message")
+        locator = [bytes(view[offset + 32 * i:offset + 32 * (i + 1)]) for i in range(count)]
+        offset += 32 * count
+        return cls(little_endian_to_int(view[0:4]), locator, bytes(view[offset:offset + 32]))
+
+
+class HeadersMessage:
+    """
+    Block headers, each an 80 byte record followed by a transaction count of 0.
+    headers holds the raw records as memoryviews into the received payload.
+    """
+    command = b"headers"
+
+    def __init__(self, headers=None):
+        self.headers = list(headers) if headers is not None else []
+
+    def serialize(self) -> bytes:
+        result = bytearray(encode_varint(len(self.headers)))
+        for header in self.headers:
+            result += header
+            result += b"\x00"
+        return bytes(result)
+
+    @classmethod
+    def parse(cls, payload):
+        view = memoryview(payload)
+        count, offset = parse_varint(view)
+        headers = []
+        for _ in range(count):
+            header = view[offset:offset + BLOCK_HEADER_SIZE]
+            if len(header) != BLOCK_HEADER_SIZE:
+                raise ValueError("Truncated block header")
+            tx_count, offset = parse_varint(view, offset + BLOCK_HEADER_SIZE)
+            if tx_count != 0:
+                raise ValueError("Headers message with a non-zero transaction count")
+            headers.append(header)
+        return cls(headers)
+
+    def block_headers(self) -> list:
+        return [BlockHeader.parse(header) for header in self.headers]
+
+
+MESSAGES = {
+    message.command: message
+    for message in (
+        VersionMessage,
+        VerAckMessage,
+        PingMessage,
+        PongMessage,
+        InvMessage,
+        GetDataMessage,
+        NotFoundMessage,
+        GetHeadersMessage,
+        HeadersMessage,
+    )
+}
+
+
+class Peer:
+    """
+    Connection to a single peer over asyncio streams.
+    Many peers can share one event loop: nothing here blocks or spawns threads.
+    Pings received while waiting for another message are answered automatically.
+    """
+    def __init__(self, reader, writer, magic: bytes = MAINNET_MAGIC):
+        self.reader = reader
+        self.writer = writer
+        self.magic = magic
+        self.remote_version = None
+
+    @classmethod
+    async def connect(cls, host, port=8333, magic: bytes = MAINNET_MAGIC, timeout=10):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        return cls(reader, writer, magic)
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    def write(self, message):
+        """Queues a message without waiting for the transport to drain"""
+        self.writer.write(NetworkEnvelope(message.command, message.serialize(), self.magic).serialize())
+
+    async def send(self, message):
+        self.write(message)
+        await self.writer.drain()
+
+    async def read_envelope(self) -> NetworkEnvelope:
+        return await NetworkEnvelope.read(self.reader, self.magic)
+
+    async def wait_for(self, *message_classes):
+        """Reads messages until one of the given classes arrives and returns it parsed"""
+        commands = {message.command: message for message in message_classes}
+        while True:
+            envelope = await self.read_envelope()
+            if envelope.command in commands:
+                return commands[envelope.command].parse(envelope.payload)
+            await self._handle_unsolicited(envelope)
+
+    async def _handle_unsolicited(self, envelope):
+        if envelope.command == PingMessage.command:
+            await self.send(PongMessage(PingMessage.parse(envelope.payload).nonce))
+        elif envelope.command == VersionMessage.command:
+            self.remote_version = VersionMessage.parse(envelope.payload)
+            await self.send(VerAckMessage())
+
+    async def handshake(self, version: VersionMessage = None):
+        """Sends our version and waits for the peer's version and verack"""
+        await self.send(version or VersionMessage())
+        received_version = received_verack = False
+        while not (received_version and received_verack):
+            envelope = await self.read_envelope()
+            if envelope.command == VersionMessage.command:
+                self.remote_version = VersionMessage.parse(envelope.payload)
+                await self.send(VerAckMessage())
+                received_version = True
+            elif envelope.command == VerAckMessage.command:
+                received_verack = True
+            else:
+                await self._handle_unsolicited(envelope)
+
+    async def ping(self) -> float:
+        """Returns the round trip time in seconds"""
+        started = time.monotonic()
+        ping = PingMessage()
+        await self.send(ping)
+        while True:
+            pong = await self.wait_for(PongMessage)
+            if pong.nonce == ping.nonce:
+                return time.monotonic() - started
+
+    async def get_headers(self, locator, end_block=None) -> HeadersMessage:
+        await self.send(GetHeadersMessage(locator=locator, end_block=end_block))
+        return await self.wait_for(HeadersMessage)
+
+    async def iter_data(self, items, window=256, batch=64, timeout=60):
+        """
+        Requests every (type, hash) inventory item and yields the responses
+        (block, tx, ... envelopes) as they arrive.
+        getdata requests are pipelined: up to `window` items are kept in flight,
+        requested `batch` items per getdata message (batch must not exceed window). Items the peer reports in
+        notfound are skipped.
+        A MSG_FILTERED_BLOCK is answered by a merkleblock followed by the matched
+        transactions: they are yielded too, but only the merkleblock counts as the
+        response, so filtered blocks cannot be requested along with transactions.
+        The transactions of the last merkleblock are read up to the answer of a
+        ping sent after it, as peers answer messages in order.
+        Raises asyncio.TimeoutError when nothing arrives for `timeout` seconds
+        (None to wait forever).
+        """
+        if window < 1 or batch < 1:
+            raise ValueError("window and batch must be at least 1")
+        items = list(items)
+        inv_types = {inv_type for inv_type, _ in items}
+        filtered = MSG_FILTERED_BLOCK in inv_types
+        if filtered and inv_types & {MSG_TX, MSG_WITNESS_TX}:
+            raise ValueError("Filtered blocks and transactions must be requested separately")
+        batch = min(batch, window)
+        requested = 0
+        outstanding = 0
+        while requested < len(items) or outstanding:
+            # top the window up a full batch at a time rather than one item per response
+            while requested < len(items) and window - outstanding >= min(batch, len(items) - requested):
+                size = min(batch, len(items) - requested)
+                self.write(GetDataMessage(items[requested:requested + size]))
+                requested += size
+                outstanding += size
+            await self.writer.drain()
+            envelope = await asyncio.wait_for(self.read_envelope(), timeout)
+            if envelope.command == NotFoundMessage.command:
+                outstanding -= len(NotFoundMessage.parse(envelope.payload).items)
+            elif envelope.command in (PingMessage.command, VersionMessage.command):
+                await self._handle_unsolicited(envelope)
+            elif envelope.command in (b"block", b"tx", b"merkleblock"):
+                if not (filtered and envelope.command == b"tx"):
+                    outstanding -= 1
+                yield envelope
+        if filtered:
+            ping = PingMessage()
+            await self.send(ping)
+            while True:
+                envelope = await asyncio.wait_for(self.read_envelope(), timeout)
+                if envelope.command == b"tx":
+                    yield envelope
+                elif envelope.command == PongMessage.command:
+                    if PongMessage.parse(envelope.payload).nonce == ping.nonce:
+                        break
+                else:
+                    await self._handle_unsolicited(envelope)
+
+    async def get_data(self, items, window=256, batch=64, timeout=60) -> list:
+        return [envelope async for envelope in self.iter_data(items, window, batch, timeout)]
+
+
+async def connect_many(addresses, magic: bytes = MAINNET_MAGIC, timeout=10):
+    """
+    Connects to and handshakes with every (host, port) concurrently on the
+    current event loop. Returns the peers that succeeded.
+    """
+    async def connect(host, port):
+        peer = await Peer.connect(host, port, magic, timeout)
+        try:
+            await asyncio.wait_for(peer.handshake(), timeout)
+        except BaseException:
+            await peer.close()
+            raise
+        return peer
+
+    results = await asyncio.gather(*(connect(host, port) for host, port in addresses), return_exceptions=True)
+    return [peer for peer in results if isinstance(peer, Peer)]
@@ -0,0 +1,90 @@
+"""
+Versioned on-disk cache for precomputed tables.
+
+Each table is a file named <name>-v<version>.bin in cache_dir():
+
+    magic (8) | version (4) | body length (8) | sha256(body) (32) | body
+
+load() memory-maps the file and checks the header and the checksum before
+returning the body, so worker processes read the table instead of recomputing
+it. Set PY_BITCOIN_CACHE_DIR to change the directory, or to an empty string
+to disable the cache.
+"""
+import hashlib
+import mmap
+import os
+import struct
+
+_MAGIC = b"PYBTCTAB"
+_HEADER = struct.Struct("<8sIQ32s")
+
+
+def cache_dir():
+    """Directory of the cache files, None when caching is disabled"""
+    directory = os.environ.get("PY_BITCOIN_CACHE_DIR")
+    if directory is not None:
+        return directory or None
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "py_bitcoin")
+
+
+def cache_path(name, version):
+    directory = cache_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, f"{name}-v{version}.bin")
+
+
+def load(name, version):
+    """
+    Returns a read-only memoryview over the cached body of a table, or None if
+    there is no cache file or it does not pass the version and checksum checks.
+    """
+    path = cache_path(name, version)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+    try:
+        magic, file_version, length, checksum = _HEADER.unpack_from(mapped)
+    except struct.error:
+        mapped.close()
+        return None
+    if magic != _MAGIC or file_version != version or len(mapped) != _HEADER.size + length:
+        mapped.close()
+        return None
+    body = memoryview(mapped)[_HEADER.size:]
+    if hashlib.sha256(body).digest() != checksum:
+        body.release()
+        mapped.close()
+        return None
+    # the memoryview keeps the map open for as long as the table is in use
+    return body
+
+
+def store(name, version, body):
+    """
+    Writes a table to the cache, atomically replacing any previous file.
+    Returns the path, or None if caching is disabled or the directory is not writable.
+    """
+    path = cache_path(name, version)
+    if path is None:
+        return None
+    header = _HEADER.pack(_MAGIC, version, len(body), hashlib.sha256(body).digest())
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(temporary, "wb") as f:
+                f.write(header)
+                f.write(body)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+    except OSError:
+        return None
+    return path
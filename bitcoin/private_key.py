@@ -1,8 +1,23 @@
 from .secp256k1 import S256Point
-from .utils import encode_base58_checksum
+from .utils import batch_inverse, encode_base58_checksum, inverse
 import hmac
 import hashlib
 
+# RFC 6979 always starts with K = 0x00 * 32: key this HMAC once and copy it
+_HMAC_ZERO_KEY = hmac.new(b"\x00" * 32, digestmod=hashlib.sha256)
+
+
+def _hmac_digest(keyed, msg):
+    h = keyed.copy()
+    h.update(msg)
+    return h.digest()
+
+
+def _sign_chunk(secret_key, zs):
+    """Worker entry point for PrivateKey.sign_many"""
+    return PrivateKey(secret_key).sign_many(zs)
+
+
 class Signature:
     def __init__(self, r, s):
         self.r = r
@@ -49,23 +64,23 @@ class Signature:
         Returns:
             Signature: instance of the Signature class containing r and s values
         """
-        der_bin = der_bin.lstrip(b"\x30")
-        length = der_bin[0]
-        der_bin = der_bin.lstrip(length.to_bytes(2, byteorder="little"))
-
-        der_bin = der_bin.lstrip(b"\x02")
-        r_length = der_bin[0]
-        der_bin = der_bin.lstrip(r_length.to_bytes(2, byteorder="big"))
-        r = der_bin[:r_length]
-        der_bin = der_bin.lstrip(r)
-        r = r.lstrip(b"\x00")
-
-        der_bin = der_bin.lstrip(b"\x02")
-        s_length = der_bin[0]
-        der_bin = der_bin.lstrip(s_length.to_bytes(2, byteorder="big"))
-        s = der_bin[:s_length]
-        der_bin = der_bin.lstrip(s)
-        s = s.lstrip(b"\x00")
+        if len(der_bin) < 8 or der_bin[0] != 0x30:
+            raise ValueError("Bad signature: missing DER sequence marker")
+        if der_bin[1] + 2 != len(der_bin):
+            raise ValueError("Bad signature: wrong length")
+        values = []
+        start = 2
+        for _ in range(2):
+            if start + 2 > len(der_bin) or der_bin[start] != 0x02:
+                raise ValueError("Bad signature: missing DER integer marker")
+            length = der_bin[start + 1]
+            if start + 2 + length > len(der_bin):
+                raise ValueError("Bad signature: integer length overruns the signature")
+            values.append(der_bin[start + 2:start + 2 + length])
+            start += 2 + length
+        if start != len(der_bin):
+            raise ValueError("Bad signature: trailing bytes")
+        r, s = values
 
         return Signature(
             r = int.from_bytes(r, "big"),
@@ -78,20 +93,75 @@ class PrivateKey:
         if secret_key is None:
             secret_key = 0x79be667ef9dcbbac55a06295ce870b07029bfcdb2dce28d959f2815b16f81798
         self.secret_key = secret_key
+        self._nonce_state = None
+
+    def __getstate__(self):
+        # the cached HMAC object cannot be pickled or copied, the copy recomputes it
+        state = self.__dict__.copy()
+        state["_nonce_state"] = None
+        return state
 
     @property
     def pub_key(self) -> S256Point:
-        return self.secret_key * S256Point.G()
+        return S256Point.base_mul(self.secret_key)
 
     def sign(self, z):
         k = self.deterministic_k(z)
-        r = (k * S256Point.G()).x.num
-        k_inv = pow(k, S256Point.N - 2, S256Point.N)
+        r = S256Point.base_mul(k).x.num
+        k_inv = inverse(k, S256Point.N)
+        return self._signature(z, r, k_inv)
+
+    def sign_many(self, zs, processes=None):
+        """
+        Signs every message hash in zs, producing the same signatures as sign.
+        The nonces are inverted in a single batch and the R points are computed
+        together with S256Point.base_mul_many.
+
+        Args:
+            zs (iterable): 256bit numbers to sign
+            processes (int): if greater than 1, split zs into that many chunks
+                signed in a pool of worker processes.
+
+        Returns:
+            list: a Signature for every z, in the same order
+        """
+        zs = list(zs)
+        if not zs:
+            return []
+        if processes is not None and processes > 1 and len(zs) > 1:
+            # imported here: concurrent.futures alone doubles the package import time
+            from concurrent.futures import ProcessPoolExecutor
+            size = -(-len(zs) // processes)
+            chunks = [zs[i:i + size] for i in range(0, len(zs), size)]
+            with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+                results = pool.map(_sign_chunk, [self.secret_key] * len(chunks), chunks)
+                return [sig for chunk in results for sig in chunk]
+
+        ks = [self.deterministic_k(z) for z in zs]
+        k_invs = batch_inverse(ks, S256Point.N)
+        points = S256Point.base_mul_many(ks)
+        return [
+            self._signature(z, point.x.num, k_inv)
+            for z, point, k_inv in zip(zs, points, k_invs)
+        ]
+
+    def _signature(self, z, r, k_inv):
         s = (z + r * self.secret_key) * k_inv % S256Point.N
         if s > S256Point.N / 2:
             s = S256Point.N - s
         return Signature(r, s)
 
+    def _nonce_prefix(self):
+        """
+        HMAC state of the first RFC 6979 step with V || 0x00 || secret already fed in.
+        It only depends on the secret key, so it is computed once per key.
+        """
+        if self._nonce_state is None or self._nonce_state[0] != self.secret_key:
+            h = _HMAC_ZERO_KEY.copy()
+            h.update(b"\x01" * 32 + b"\x00" + self.secret_key.to_bytes(32, "big"))
+            self._nonce_state = (self.secret_key, h)
+        return self._nonce_state[1]
+
     def deterministic_k(self, z):
         """
         Deterministic k such that the value of k is unique to the private key
@@ -99,24 +169,25 @@ class PrivateKey:
         for the same private key. If the same k is used twice to sign different messages,
         then the private key can easily be extracted.
         """
-        k = b"\x00" * 32
         v = b"\x01" * 32
         if z > S256Point.N:
             z -= S256Point.N
         z_bytes = z.to_bytes(32, "big")
         secret_bytes = self.secret_key.to_bytes(32, "big")
-        s256 = hashlib.sha256()
-        k = hmac.new(k, v + b"\x00" + secret_bytes + z_bytes, s256).digest()
-        v = hmac.new(k, v, s256).digest()
-        k = hmac.new(k, v + b"\x01" + secret_bytes + z_bytes, s256).digest()
-        v = hmac.new(k, v, s256).digest()
+        k = _hmac_digest(self._nonce_prefix(), z_bytes)
+        keyed = hmac.new(k, digestmod=hashlib.sha256)
+        v = _hmac_digest(keyed, v)
+        k = _hmac_digest(keyed, v + b"\x01" + secret_bytes + z_bytes)
+        keyed = hmac.new(k, digestmod=hashlib.sha256)
+        v = _hmac_digest(keyed, v)
         while True:
-            v = hmac.new(k, v, s256).digest()
+            v = _hmac_digest(keyed, v)
             candidate = int.from_bytes(v, "big")
             if 1 <= candidate < S256Point.N:
                 return candidate
-            k = hmac.new(k, v + b"\x00", s256).digest()
-            v = hmac.new(k, v, s256).digest()
+            k = _hmac_digest(keyed, v + b"\x00")
+            keyed = hmac.new(k, digestmod=hashlib.sha256)
+            v = _hmac_digest(keyed, v)
 
     def address(self, compressed=True, testnet=False):
         return self.pub_key.address(compressed=compressed, testnet=testnet)
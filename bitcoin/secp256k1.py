@@ -1,5 +1,6 @@
 from .finite_fields import FieldElement, S256Field
-from .utils import encode_base58_checksum, hash160
+from . import precompute
+from .utils import batch_inverse, encode_base58_checksum, hash160, inverse
 
 class Point:
     def __init__(
@@ -83,6 +84,91 @@ class Point:
         return result
 
 
+# fixed-base multiplication table: for each 4 bit window j of the scalar,
+# the points d * 16^j * G for d = 1..15, stored as (x, y) integers
+_WINDOW_BITS = 4
+_WINDOW_MASK = (1 << _WINDOW_BITS) - 1
+_WINDOW_SIZE = _WINDOW_MASK
+_WINDOWS = 256 // _WINDOW_BITS
+_G_TABLE_NAME = "secp256k1-generator-w4"
+_G_TABLE_VERSION = 1
+_G_TABLE = None
+
+
+def _count_additions(count):
+    """Called with the number of point additions base_mul_many does in plain integers; metrics patches it"""
+
+
+def _build_generator_table():
+    table = []
+    base = S256Point.G()
+    for _ in range(_WINDOWS):
+        current = base
+        for _ in range(_WINDOW_SIZE):
+            table.append((current.x.num, current.y.num))
+            current = current + base
+        base = current
+    return table
+
+
+def _check_generator_table(table):
+    """
+    Checks every entry of a loaded table: the first one must be G, and each
+    entry of a window (then the first entry of the next window, 15 + 1 = 16
+    times the base) the previous entry plus the window's base, d * 16^j * G.
+    The additions of a window share a single batch_inverse.
+    """
+    P = S256Point.P
+    G = S256Point.G()
+    if len(table) != _WINDOWS * _WINDOW_SIZE or table[0] != (G.x.num, G.y.num):
+        return False
+    for row in range(0, len(table), _WINDOW_SIZE):
+        bx, by = table[row]
+        expected = table[row + 1:row + _WINDOW_SIZE + 1]
+        previous = table[row:row + len(expected)]
+        # the first addition is base + base, a doubling
+        try:
+            inverses = batch_inverse([2 * by] + [x - bx for x, _ in previous[1:]], P)
+        except ValueError:
+            return False
+        for d, ((x, y), inv) in enumerate(zip(previous, inverses)):
+            if d == 0:
+                s = 3 * bx * bx * inv % P
+            else:
+                s = (y - by) * inv % P
+            x3 = (s * s - x - bx) % P
+            if expected[d] != (x3, (s * (x - x3) - y) % P):
+                return False
+    return True
+
+
+def _generator_table():
+    """
+    Returns the fixed-base table, loaded from the precompute cache when
+    possible and built (then cached) otherwise. A cached table is decoded
+    into integers, so the cache saves the build but not the memory.
+    """
+    global _G_TABLE
+    if _G_TABLE is None:
+        table = None
+        body = precompute.load(_G_TABLE_NAME, _G_TABLE_VERSION)
+        if body is not None:
+            if len(body) == _WINDOWS * _WINDOW_SIZE * 64:
+                table = [
+                    (int.from_bytes(body[i:i + 32], "big"), int.from_bytes(body[i + 32:i + 64], "big"))
+                    for i in range(0, len(body), 64)
+                ]
+            body.release()
+        if table is not None and _check_generator_table(table):
+            _G_TABLE = table
+        else:
+            _G_TABLE = _build_generator_table()
+            precompute.store(_G_TABLE_NAME, _G_TABLE_VERSION, b"".join(
+                x.to_bytes(32, "big") + y.to_bytes(32, "big") for x, y in _G_TABLE
+            ))
+    return _G_TABLE
+
+
 class S256Point(Point):
     """
     S256Point class inherits from Point class.
@@ -114,6 +200,56 @@ class S256Point(Point):
         other = other % self.N
         return super().__rmul__(other)
 
+    @classmethod
+    def base_mul(cls, k):
+        """Returns k * G, using the precomputed powers of the generator"""
+        return cls.base_mul_many([k])[0]
+
+    @classmethod
+    def base_mul_many(cls, ks):
+        """
+        Computes k * G for every k in ks.
+        Adds one precomputed multiple of G per 4 bit window of the scalar, so no
+        point doublings are needed, and the additions of every scalar in the
+        same window share a single field inversion (see utils.batch_inverse).
+
+        Args:
+            ks (list): integer scalars
+
+        Returns:
+            list: the S256Point k * G for every k, in the same order
+        """
+        P = cls.P
+        table = _generator_table()
+        ks = [k % cls.N for k in ks]
+        xs = [None] * len(ks)
+        ys = [None] * len(ks)
+        for window in range(_WINDOWS):
+            shift = window * _WINDOW_BITS
+            row = window * _WINDOW_SIZE - 1
+            pending = []
+            for i, k in enumerate(ks):
+                digit = (k >> shift) & _WINDOW_MASK
+                if digit:
+                    gx, gy = table[row + digit]
+                    if xs[i] is None:
+                        xs[i], ys[i] = gx, gy
+                    else:
+                        pending.append((i, gx, gy))
+            if not pending:
+                continue
+            # the running sum is (k mod 16^j) * G and the table entry d * 16^j * G
+            # with k < N, so they are never equal or opposite: no doubling or
+            # point at infinity to special-case here
+            _count_additions(len(pending))
+            inverses = batch_inverse([(gx - xs[i]) % P for i, gx, _ in pending], P)
+            for (i, gx, gy), inv in zip(pending, inverses):
+                s = (gy - ys[i]) * inv % P
+                x3 = (s * s - xs[i] - gx) % P
+                ys[i] = (s * (xs[i] - x3) - ys[i]) % P
+                xs[i] = x3
+        return [cls(None, None) if x is None else cls(x, y) for x, y in zip(xs, ys)]
+
     def __mul__(self, other):
         return self.__mul__(other)
 
@@ -132,10 +268,10 @@ class S256Point(Point):
             bool: a boolean describing the validity of the signature.
         """
 
-        s_inv = pow(sig.s, self.N - 2, self.N)
+        s_inv = inverse(sig.s, self.N)
         u = z * s_inv % self.N
         v = sig.r * s_inv % self.N
-        total = u * S256Point.G() + v * self
+        total = S256Point.base_mul(u) + v * self
         return total.x.num == sig.r
 
     def sec(self, compressed=True):
@@ -0,0 +1,405 @@
+"""
+Signing / verification service over a local TCP or Unix socket.
+
+Every frame is a 4 byte big endian length followed by the payload.
+Request payload:  op (1 byte) | request id (4 bytes) | body
+Response payload: status (1 byte) | request id (4 bytes) | body
+
+    OP_SIGN     body: secret (32) | z (32)                  -> DER signature
+    OP_VERIFY   body: len(sec) (1) | sec | z (32) | DER sig -> 0x01 if valid else 0x00
+    OP_PUBKEY   body: secret (32)                           -> compressed SEC
+    OP_METRICS  body: empty                                 -> server metrics as JSON
+
+On STATUS_ERROR the response body is the utf-8 error message.
+Requests arriving within `batch_window` seconds of each other are handed
+to the executor (a process pool by default) as a single batch.
+"""
+from .private_key import PrivateKey, Signature
+from .secp256k1 import S256Point
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import asyncio
+import json
+import struct
+import time
+
+OP_SIGN = 0x01
+OP_VERIFY = 0x02
+OP_PUBKEY = 0x03
+OP_METRICS = 0x04
+
+STATUS_OK = 0x00
+STATUS_ERROR = 0x01
+
+MAX_FRAME_SIZE = 1 << 20
+
+_LENGTH = struct.Struct(">I")
+_HEADER = struct.Struct(">BI")
+
+
+async def read_frame(reader):
+    """Reads one length-prefixed frame, returns None on a clean end of stream"""
+    try:
+        prefix = await reader.readexactly(_LENGTH.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (length,) = _LENGTH.unpack(prefix)
+    if length < _HEADER.size or length > MAX_FRAME_SIZE:
+        raise ValueError(f"Invalid frame length {length}")
+    return await reader.readexactly(length)
+
+
+def encode_frame(kind, request_id, body=b""):
+    """kind is the op of a request or the status of a response"""
+    return _LENGTH.pack(_HEADER.size + len(body)) + _HEADER.pack(kind, request_id) + body
+
+
+def _parse_secret(body):
+    secret = int.from_bytes(body[:32], "big")
+    if not 1 <= secret < S256Point.N:
+        raise ValueError("Secret key out of range")
+    return secret
+
+
+def _run_batch(items):
+    """
+    Executes a batch of (op, body) requests, returns a (status, body) per request.
+    Runs in the executor: sign requests sharing a key go through PrivateKey.sign_many
+    and all pubkey requests through a single S256Point.base_mul_many.
+    """
+    results = [None] * len(items)
+    signs = {}
+    pubkeys = []
+    for i, (op, body) in enumerate(items):
+        try:
+            if op == OP_SIGN:
+                if len(body) != 64:
+                    raise ValueError("Sign request body must be 64 bytes")
+                secret = _parse_secret(body)
+                signs.setdefault(secret, []).append((i, int.from_bytes(body[32:], "big")))
+            elif op == OP_PUBKEY:
+                if len(body) != 32:
+                    raise ValueError("Pubkey request body must be 32 bytes")
+                pubkeys.append((i, _parse_secret(body)))
+            elif op == OP_VERIFY:
+                sec_length = body[0]
+                sec = body[1:1 + sec_length]
+                z = int.from_bytes(body[1 + sec_length:33 + sec_length], "big")
+                sig = Signature.parse(body[33 + sec_length:])
+                valid = S256Point.parse(sec).verify(z, sig)
+                results[i] = (STATUS_OK, b"\x01" if valid else b"\x00")
+            else:
+                raise ValueError(f"Unknown op {op}")
+        except Exception as e:
+            results[i] = (STATUS_ERROR, str(e).encode())
+
+    for secret, requests in signs.items():
+        signatures = PrivateKey(secret).sign_many([z for _, z in requests])
+        for (i, _), sig in zip(requests, signatures):
+            results[i] = (STATUS_OK, sig.der())
+    if pubkeys:
+        points = S256Point.base_mul_many([secret for _, secret in pubkeys])
+        for (i, _), point in zip(pubkeys, points):
+            results[i] = (STATUS_OK, point.sec())
+    return results
+
+
+class SigningServer:
+    """
+    asyncio front end micro-batching requests into an executor.
+
+    Args:
+        executor (Executor): runs the batches, defaults to a ProcessPoolExecutor.
+        batch_window (float): seconds to wait for more requests before flushing a batch.
+        max_batch (int): flush as soon as this many requests are queued.
+        max_pending (int): requests in flight before connections stop being read.
+    """
+    def __init__(self, executor=None, batch_window=0.002, max_batch=256, max_pending=4096):
+        self.executor = executor
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._owns_executor = executor is None
+        self._pending = None
+        self._in_flight = 0
+        self._queue = []
+        self._flush_handle = None
+        self._server = None
+        self._closing = False
+        self._connections = set()
+        self._batches = set()
+        self._started = time.monotonic()
+        self._latencies = deque(maxlen=10000)
+        self._counters = {
+            "requests": 0,
+            "responses": 0,
+            "errors": 0,
+            "batches": 0,
+            "batched_requests": 0,
+            "max_batch_size": 0,
+            "connections": 0,
+        }
+
+    async def start_tcp(self, host="127.0.0.1", port=0):
+        self._prepare()
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server
+
+    async def start_unix(self, path):
+        self._prepare()
+        self._server = await asyncio.start_unix_server(self._handle_connection, path)
+        return self._server
+
+    async def close(self):
+        """
+        Stops listening and reading requests, answers the queued ones with an
+        error, waits for the running batches and the responses to be written,
+        then closes every connection and the executor if the server created it.
+        """
+        self._closing = True
+        if self._server is not None:
+            self._server.close()
+        for task in self._connections:
+            task.cancel()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        queued, self._queue = self._queue, []
+        for _, _, future in queued:
+            if not future.done():
+                future.set_result((STATUS_ERROR, b"Server closed"))
+        if self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._connections:
+            await asyncio.gather(*self._connections, return_exceptions=True)
+        if self._server is not None:
+            await self._server.wait_closed()
+        if self._owns_executor and self.executor is not None:
+            self.executor.shutdown()
+
+    def _prepare(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor()
+        self._pending = asyncio.Semaphore(self.max_pending)
+        self._started = time.monotonic()
+
+    def metrics(self) -> dict:
+        """Counters, latency percentiles (seconds) and throughput since start"""
+        result = dict(self._counters)
+        uptime = time.monotonic() - self._started
+        result["pending"] = self._in_flight
+        result["queued"] = len(self._queue)
+        result["uptime"] = uptime
+        result["throughput"] = result["responses"] / uptime if uptime > 0 else 0.0
+        latencies = sorted(self._latencies)
+        for name, quantile in (("latency_p50", 0.5), ("latency_p99", 0.99)):
+            result[name] = latencies[int(quantile * (len(latencies) - 1))] if latencies else 0.0
+        result["latency_max"] = latencies[-1] if latencies else 0.0
+        return result
+
+    async def _handle_connection(self, reader, writer):
+        self._counters["connections"] += 1
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        tasks = set()
+        try:
+            while True:
+                frame = await read_frame(reader)
+                if frame is None:
+                    break
+                op, request_id = _HEADER.unpack_from(frame)
+                self._counters["requests"] += 1
+                if op == OP_METRICS:
+                    body = json.dumps(self.metrics()).encode()
+                    writer.write(encode_frame(STATUS_OK, request_id, body))
+                    continue
+                # backpressure: stop reading this connection until a slot frees up
+                await self._pending.acquire()
+                self._in_flight += 1
+                task = asyncio.ensure_future(self._respond(writer, op, request_id, frame[_HEADER.size:]))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # close() cancels the connections, ending the task normally keeps
+            # asyncio.start_server from logging the cancellation
+            if not self._closing:
+                raise
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            self._connections.discard(connection)
+
+    async def _respond(self, writer, op, request_id, body):
+        started = time.monotonic()
+        try:
+            future = asyncio.get_running_loop().create_future()
+            if self._closing:
+                future.set_result((STATUS_ERROR, b"Server closed"))
+            else:
+                self._queue.append((op, body, future))
+                if len(self._queue) >= self.max_batch:
+                    self._flush()
+                elif self._flush_handle is None:
+                    self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+            status, result = await future
+        finally:
+            self._in_flight -= 1
+            self._pending.release()
+        self._latencies.append(time.monotonic() - started)
+        self._counters["responses"] += 1
+        if status != STATUS_OK:
+            self._counters["errors"] += 1
+        if not writer.is_closing():
+            writer.write(encode_frame(status, request_id, result))
+            await writer.drain()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._queue = self._queue, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run(self, batch):
+        self._counters["batches"] += 1
+        self._counters["batched_requests"] += len(batch)
+        self._counters["max_batch_size"] = max(self._counters["max_batch_size"], len(batch))
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(self.executor, _run_batch, [(op, body) for op, body, _ in batch])
+        except Exception as e:
+            results = [(STATUS_ERROR, str(e).encode())] * len(batch)
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class SigningClient:
+    """Pipelining client for SigningServer, responses are matched by request id"""
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._waiting = {}
+        self._reading = asyncio.ensure_future(self._read_responses())
+
+    @classmethod
+    async def open_tcp(cls, host="127.0.0.1", port=8335):
+        reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    @classmethod
+    async def open_unix(cls, path):
+        reader, writer = await asyncio.open_unix_connection(path)
+        return cls(reader, writer)
+
+    async def close(self):
+        self._writer.close()
+        self._reading.cancel()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def sign(self, secret_key, z) -> Signature:
+        body = secret_key.to_bytes(32, "big") + z.to_bytes(32, "big")
+        return Signature.parse(await self._call(OP_SIGN, body))
+
+    async def verify(self, point, z, sig) -> bool:
+        sec = point.sec() if isinstance(point, S256Point) else point
+        body = bytes([len(sec)]) + sec + z.to_bytes(32, "big") + sig.der()
+        return await self._call(OP_VERIFY, body) == b"\x01"
+
+    async def pub_key(self, secret_key) -> S256Point:
+        return S256Point.parse(await self._call(OP_PUBKEY, secret_key.to_bytes(32, "big")))
+
+    async def metrics(self) -> dict:
+        return json.loads(await self._call(OP_METRICS))
+
+    async def _call(self, op, body=b""):
+        if self._reading.done():
+            # nothing would ever answer the request
+            raise ConnectionError("Connection to the signing server closed")
+        request_id = self._next_id
+        self._next_id = (self._next_id + 1) & 0xffffffff
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self._writer.write(encode_frame(op, request_id, body))
+        await self._writer.drain()
+        return await future
+
+    async def _read_responses(self):
+        error = ConnectionError("Connection to the signing server closed")
+        try:
+            while True:
+                frame = await read_frame(self._reader)
+                if frame is None:
+                    break
+                status, request_id = _HEADER.unpack_from(frame)
+                future = self._waiting.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                if status == STATUS_OK:
+                    future.set_result(frame[_HEADER.size:])
+                else:
+                    future.set_exception(ValueError(frame[_HEADER.size:].decode(errors="replace")))
+        except (asyncio.IncompleteReadError, ConnectionError) as e:
+            error = e
+        finally:
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._waiting.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the signing / verification service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8335)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--window-ms", type=float, default=2.0, help="batching window in milliseconds")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--max-pending", type=int, default=4096)
+    args = parser.parse_args(argv)
+
+    async def serve():
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        server = SigningServer(
+            executor=executor,
+            batch_window=args.window_ms / 1000,
+            max_batch=args.max_batch,
+            max_pending=args.max_pending,
+        )
+        if args.unix:
+            listener = await server.start_unix(args.unix)
+        else:
+            listener = await server.start_tcp(args.host, args.port)
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            await server.close()
+            executor.shutdown()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
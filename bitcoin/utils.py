@@ -3,11 +3,10 @@ import hashlib
 BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
 
 def hash256(b):
-    if type(b) is bytes:
-        return hashlib.sha256(hashlib.sha256(b).digest()).digest()
-    elif type(b) is str:
+    """double sha256, accepts str or any bytes-like object (bytes, bytearray, memoryview)"""
+    if type(b) is str:
         b = bytes(b, "utf-8")
-        return hashlib.sha256(hashlib.sha256(b).digest()).digest()
+    return hashlib.sha256(hashlib.sha256(b).digest()).digest()
 
 def encode_base58(s: bytes):
     count = 0
@@ -29,6 +28,24 @@ def encode_base58(s: bytes):
 def encode_base58_checksum(b):
     return encode_base58(b + hash256(b)[:4])
 
+def decode_base58(s: str) -> bytes:
+    num = 0
+    for c in s:
+        digit = BASE58_ALPHABET.find(c)
+        if digit < 0:
+            raise ValueError(f"Invalid base58 character {c!r}")
+        num = num * 58 + digit
+    count = len(s) - len(s.lstrip("1"))
+    return b"\x00" * count + num.to_bytes((num.bit_length() + 7) // 8, "big")
+
+def decode_base58_checksum(s: str) -> bytes:
+    """decodes a base58check string and returns the payload without its checksum"""
+    raw = decode_base58(s)
+    payload, checksum = raw[:-4], raw[-4:]
+    if len(raw) < 4 or hash256(payload)[:4] != checksum:
+        raise ValueError(f"Bad base58 checksum for {s}")
+    return payload
+
 def hash160(s):
     """sha256 followed b ripemd160"""
     sha256 = hashlib.sha256(s).digest()
@@ -37,6 +54,116 @@ def hash160(s):
 def little_endian_to_int(b: bytes) -> int:
     return int.from_bytes(b, "little")
 
-def int_to_little_endian(i: int) -> bytes:
-    return i.to_bytes(32, "little")
+def int_to_little_endian(i: int, length: int = 32) -> bytes:
+    return i.to_bytes(length, "little")
+
+def encode_varint(i: int) -> bytes:
+    """encodes an integer as a Bitcoin variable length integer (CompactSize)"""
+    if i < 0xfd:
+        return bytes([i])
+    elif i < 0x10000:
+        return b"\xfd" + i.to_bytes(2, "little")
+    elif i < 0x100000000:
+        return b"\xfe" + i.to_bytes(4, "little")
+    elif i < 0x10000000000000000:
+        return b"\xff" + i.to_bytes(8, "little")
+    raise ValueError(f"Integer {i} is too large for a varint")
+
+def parse_varint(b, offset: int = 0):
+    """
+    Reads a variable length integer from a bytes-like object without copying it.
+
+    Returns:
+        tuple: the integer and the offset of the first byte after it
+    """
+    if offset >= len(b):
+        raise ValueError("Truncated varint")
+    prefix = b[offset]
+    if prefix < 0xfd:
+        return prefix, offset + 1
+    length = {0xfd: 2, 0xfe: 4, 0xff: 8}[prefix]
+    end = offset + 1 + length
+    if end > len(b):
+        raise ValueError("Truncated varint")
+    return int.from_bytes(b[offset + 1:end], "little"), end
+
+
+def inverse(value, modulus):
+    """Inverse of value modulo modulus, raises ValueError if there is none"""
+    return pow(value, -1, modulus)
+
+
+def batch_inverse(values, modulus):
+    """
+    Inverts every value modulo a prime using a single modular exponentiation
+    (Montgomery's trick) instead of one per value.
+
+    Args:
+        values (list): integers to invert, none of them divisible by modulus
+        modulus (int): prime modulus
+
+    Returns:
+        list: the inverses, in the same order as values
+    """
+    prefix = []
+    acc = 1
+    for value in values:
+        prefix.append(acc)
+        acc = acc * value % modulus
+    if acc == 0:
+        raise ValueError("Cannot invert a value that is 0 modulo the modulus")
+    inv = pow(acc, modulus - 2, modulus)
+    result = [0] * len(prefix)
+    for i in range(len(prefix) - 1, -1, -1):
+        result[i] = prefix[i] * inv % modulus
+        inv = inv * values[i] % modulus
+    return result
+
+_MASK_64 = 0xffffffffffffffff
+
+def _sipround(v0, v1, v2, v3, rounds):
+    for _ in range(rounds):
+        v0 = (v0 + v1) & _MASK_64
+        v1 = ((v1 << 13) | (v1 >> 51)) & _MASK_64
+        v1 ^= v0
+        v0 = ((v0 << 32) | (v0 >> 32)) & _MASK_64
+        v2 = (v2 + v3) & _MASK_64
+        v3 = ((v3 << 16) | (v3 >> 48)) & _MASK_64
+        v3 ^= v2
+        v0 = (v0 + v3) & _MASK_64
+        v3 = ((v3 << 21) | (v3 >> 43)) & _MASK_64
+        v3 ^= v0
+        v2 = (v2 + v1) & _MASK_64
+        v1 = ((v1 << 17) | (v1 >> 47)) & _MASK_64
+        v1 ^= v2
+        v2 = ((v2 << 32) | (v2 >> 32)) & _MASK_64
+    return v0, v1, v2, v3
+
+def siphash_key(key: bytes):
+    """Splits a 16 byte SipHash key into the two integers taken by siphash"""
+    if len(key) != 16:
+        raise ValueError("SipHash key must be 16 bytes")
+    return int.from_bytes(key[:8], "little"), int.from_bytes(key[8:], "little")
 
+def siphash(key, data) -> int:
+    """
+    SipHash-2-4 of a bytes-like object, as a 64 bit integer.
+    key is either the 16 byte key or the (k0, k1) pair from siphash_key,
+    which saves re-parsing it when hashing many items with the same key.
+    """
+    k0, k1 = siphash_key(key) if len(key) == 16 else key
+    v0 = k0 ^ 0x736f6d6570736575
+    v1 = k1 ^ 0x646f72616e646f6d
+    v2 = k0 ^ 0x6c7967656e657261
+    v3 = k1 ^ 0x7465646279746573
+    length = len(data)
+    end = length - length % 8
+    words = [int.from_bytes(data[offset:offset + 8], "little") for offset in range(0, end, 8)]
+    words.append(((length & 0xff) << 56) | int.from_bytes(data[end:], "little"))
+    for m in words:
+        v3 ^= m
+        v0, v1, v2, v3 = _sipround(v0, v1, v2, v3, 2)
+        v0 ^= m
+    v2 ^= 0xff
+    v0, v1, v2, v3 = _sipround(v0, v1, v2, v3, 4)
+    return v0 ^ v1 ^ v2 ^ v3
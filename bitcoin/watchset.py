@@ -0,0 +1,282 @@
+from .utils import decode_base58_checksum
+import heapq
+import math
+import mmap
+import struct
+
+HASH160_SIZE = 20
+
+# file layout: header | bloom filter bits | sorted hash160s
+_FILE_MAGIC = b"PYWSET"
+_FILE_VERSION = 1
+_FILE_HEADER = struct.Struct("<6sHQQI4x")
+
+# hash160s sorted as bytes objects at a time when building a set
+_RUN_SIZE = 1 << 16
+
+
+def extract_hash160(script_pubkey):
+    """Returns the hash160 paid to by a P2PKH, P2SH or P2WPKH scriptPubKey, or None"""
+    length = len(script_pubkey)
+    if length == 25 and script_pubkey[:3] == b"\x76\xa9\x14" and script_pubkey[23:] == b"\x88\xac":
+        return bytes(script_pubkey[3:23])
+    if length == 23 and script_pubkey[:2] == b"\xa9\x14" and script_pubkey[22] == 0x87:
+        return bytes(script_pubkey[2:22])
+    if length == 22 and script_pubkey[:2] == b"\x00\x14":
+        return bytes(script_pubkey[2:22])
+    return None
+
+
+def _records(data):
+    """Yields the packed hash160s of data one at a time"""
+    for start in range(0, len(data), HASH160_SIZE):
+        yield bytes(data[start:start + HASH160_SIZE])
+
+
+def _sorted_runs(hash160s):
+    """
+    Sorts the hash160s in packed runs of _RUN_SIZE, so that at most one run
+    is held as separate bytes objects.
+    """
+    runs = []
+    chunk = []
+    for h160 in hash160s:
+        h160 = bytes(h160)
+        if len(h160) != HASH160_SIZE:
+            raise ValueError(f"{h160.hex()} is not a 20 byte hash160")
+        chunk.append(h160)
+        if len(chunk) == _RUN_SIZE:
+            chunk.sort()
+            runs.append(b"".join(chunk))
+            chunk = []
+    if chunk:
+        chunk.sort()
+        runs.append(b"".join(chunk))
+    return runs
+
+
+class BloomFilter:
+    """
+    Bloom filter over hash160s. The items are already uniformly distributed
+    hashes, so the bit positions are derived from their own bytes
+    (double hashing with two 64 bit words) instead of hashing them again.
+    """
+    def __init__(self, bits, hash_count, data=None, offset=0):
+        self.bits = bits
+        self.hash_count = hash_count
+        self.data = bytearray((bits + 7) // 8) if data is None else data
+        self.offset = offset
+
+    @classmethod
+    def for_capacity(cls, count, false_positive_rate=0.01):
+        bits = max(8, int(-count * math.log(false_positive_rate) / math.log(2) ** 2))
+        hash_count = max(1, round(bits / max(count, 1) * math.log(2)))
+        return cls(bits, hash_count)
+
+    def _positions(self, h160):
+        h1 = int.from_bytes(h160[:8], "little")
+        h2 = int.from_bytes(h160[8:16], "little") | 1
+        bits = self.bits
+        return [(h1 + i * h2) % bits for i in range(self.hash_count)]
+
+    def add(self, h160):
+        data = self.data
+        offset = self.offset
+        for position in self._positions(h160):
+            data[offset + (position >> 3)] |= 1 << (position & 7)
+
+    def __contains__(self, h160):
+        data = self.data
+        offset = self.offset
+        for position in self._positions(h160):
+            if not data[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.data[self.offset:self.offset + (self.bits + 7) // 8])
+
+
+class WatchSet:
+    """
+    Set of watched hash160s, packed as sorted 20 byte records in a single
+    bytes object (or memory-mapped file) instead of one Python object each,
+    with an optional Bloom filter answering most misses before any search.
+    """
+    def __init__(self, data, bloom=None, offset=0, count=None):
+        """
+        Args:
+            data (bytes, bytearray or mmap): sorted, unique, packed hash160s starting at offset
+            bloom (BloomFilter): optional prefilter holding every hash160
+            offset (int): position of the first hash160 in data
+            count (int): number of hash160s, defaults to the rest of data
+        """
+        if count is None:
+            if (len(data) - offset) % HASH160_SIZE:
+                raise ValueError("Packed hash160s must be a multiple of 20 bytes")
+            count = (len(data) - offset) // HASH160_SIZE
+        self._data = data
+        self._offset = offset
+        self._count = count
+        self.bloom = bloom
+
+    def __repr__(self):
+        return f"WatchSet({self._count} hash160s)"
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Releases the memory map of a set opened with load"""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    @classmethod
+    def from_hash160s(cls, hash160s, false_positive_rate=0.01):
+        """
+        The hashes are packed as they stream in: sorted runs are merged into a
+        single bytearray, dropping duplicates, without ever holding every hash
+        as its own bytes object.
+
+        Args:
+            hash160s (iterable): 20 byte hashes, e.g. from S256Point.hash160
+            false_positive_rate (float): of the Bloom filter, None for no filter
+        """
+        runs = _sorted_runs(hash160s)
+        packed = bytearray()
+        previous = None
+        for h160 in heapq.merge(*map(_records, runs)):
+            if h160 != previous:
+                packed += h160
+                previous = h160
+        del runs
+        bloom = None
+        if false_positive_rate is not None:
+            bloom = BloomFilter.for_capacity(len(packed) // HASH160_SIZE, false_positive_rate)
+            for h160 in _records(packed):
+                bloom.add(h160)
+        return cls(packed, bloom)
+
+    @classmethod
+    def from_addresses(cls, addresses, false_positive_rate=0.01):
+        """Builds the set from base58check P2PKH / P2SH addresses"""
+        def hash160s():
+            for address in addresses:
+                payload = decode_base58_checksum(address)
+                if len(payload) != HASH160_SIZE + 1:
+                    raise ValueError(f"{address} does not encode a hash160")
+                yield payload[1:]
+        return cls.from_hash160s(hash160s(), false_positive_rate)
+
+    def _item(self, index):
+        start = self._offset + index * HASH160_SIZE
+        return self._data[start:start + HASH160_SIZE]
+
+    def _bisect(self, h160, lo, hi):
+        """Index of the first stored hash160 >= h160 in [lo, hi)"""
+        data = self._data
+        offset = self._offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = offset + mid * HASH160_SIZE
+            if data[start:start + HASH160_SIZE] < h160:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def __contains__(self, h160):
+        h160 = bytes(h160)
+        if self.bloom is not None and h160 not in self.bloom:
+            return False
+        index = self._bisect(h160, 0, self._count)
+        return index < self._count and self._item(index) == h160
+
+    def contains_many(self, hash160s) -> list:
+        """
+        Membership of every hash160, in the same order.
+        Queries passing the Bloom filter are sorted and searched in increasing
+        order, each search starting where the previous one ended.
+        """
+        hash160s = [bytes(h160) for h160 in hash160s]
+        result = [False] * len(hash160s)
+        bloom = self.bloom
+        candidates = sorted(
+            (h160, i) for i, h160 in enumerate(hash160s)
+            if bloom is None or h160 in bloom
+        )
+        lo = 0
+        count = self._count
+        for h160, i in candidates:
+            lo = self._bisect(h160, lo, count)
+            if lo == count:
+                break
+            result[i] = self._item(lo) == h160
+        return result
+
+    def match_outputs(self, script_pubkeys, batch_size=4096):
+        """
+        Streams (index, script_pubkey, hash160) for every output script paying
+        to a watched hash160, checking the scripts batch_size at a time.
+        """
+        batch = []
+        for index, script_pubkey in enumerate(script_pubkeys):
+            h160 = extract_hash160(script_pubkey)
+            if h160 is not None:
+                batch.append((index, script_pubkey, h160))
+            if len(batch) >= batch_size:
+                yield from self._match_batch(batch)
+                batch = []
+        if batch:
+            yield from self._match_batch(batch)
+
+    def _match_batch(self, batch):
+        found = self.contains_many([h160 for _, _, h160 in batch])
+        for output, matched in zip(batch, found):
+            if matched:
+                yield output
+
+    def save(self, path):
+        bloom = self.bloom
+        with open(path, "wb") as f:
+            f.write(_FILE_HEADER.pack(
+                _FILE_MAGIC,
+                _FILE_VERSION,
+                self._count,
+                bloom.bits if bloom is not None else 0,
+                bloom.hash_count if bloom is not None else 0,
+            ))
+            if bloom is not None:
+                f.write(bloom.to_bytes())
+            start = self._offset
+            f.write(self._data[start:start + self._count * HASH160_SIZE])
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-maps a set written by save. The pages are shared by every
+        process loading the same file; call close() (or use a with block) when done.
+        """
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, count, bloom_bits, hash_count = _FILE_HEADER.unpack_from(mapped)
+            if magic != _FILE_MAGIC or version != _FILE_VERSION:
+                raise ValueError(f"{path} is not a version {_FILE_VERSION} watch set file")
+            offset = _FILE_HEADER.size
+            bloom = None
+            if bloom_bits:
+                bloom = BloomFilter(bloom_bits, hash_count, mapped, offset)
+                offset += (bloom_bits + 7) // 8
+            if len(mapped) != offset + count * HASH160_SIZE:
+                raise ValueError(f"{path} does not match its header size")
+        except (ValueError, struct.error):
+            mapped.close()
+            raise
+        return cls(mapped, bloom, offset, count)
@@ -0,0 +1,84 @@
+"""
+Load generator for bitcoin.service.
+
+    python -m bitcoin.service --port 8335 &
+    python scripts/service_loadgen.py --port 8335 --requests 5000 --concurrency 256
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bitcoin import PrivateKey
+from bitcoin.service import SigningClient
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    keys = [PrivateKey(rng.randrange(1, 2**256)) for _ in range(args.keys)]
+    if args.unix:
+        client = await SigningClient.open_unix(args.unix)
+    else:
+        client = await SigningClient.open_tcp(args.host, args.port)
+    pub_keys = [await client.pub_key(key.secret_key) for key in keys]
+    sample_z = rng.randrange(2**256)
+    sample_sigs = [await client.sign(key.secret_key, sample_z) for key in keys]
+
+    ops = [rng.choices(("sign", "verify", "pubkey"), weights=args.mix)[0] for _ in range(args.requests)]
+    latencies = []
+    errors = 0
+    limit = asyncio.Semaphore(args.concurrency)
+
+    async def one(op):
+        nonlocal errors
+        i = rng.randrange(len(keys))
+        async with limit:
+            started = time.perf_counter()
+            try:
+                if op == "sign":
+                    await client.sign(keys[i].secret_key, rng.randrange(2**256))
+                elif op == "verify":
+                    await client.verify(pub_keys[i], sample_z, sample_sigs[i])
+                else:
+                    await client.pub_key(keys[i].secret_key)
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(op) for op in ops))
+    elapsed = time.perf_counter() - started
+    server_metrics = await client.metrics()
+    await client.close()
+
+    latencies.sort()
+    print(f"requests:    {args.requests} ({errors} errors)")
+    print(f"elapsed:     {elapsed:.3f}s")
+    print(f"throughput:  {args.requests / elapsed:.1f} req/s")
+    for name, quantile in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+        print(f"latency {name}: {latencies[int(quantile * (len(latencies) - 1))] * 1000:.2f}ms")
+    batches = server_metrics["batches"] or 1
+    print(f"server:      {server_metrics['batches']} batches, "
+          f"{server_metrics['batched_requests'] / batches:.1f} requests/batch")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate load against the signing service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8335)
+    parser.add_argument("--unix", help="connect to this Unix socket path instead of TCP")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=128)
+    parser.add_argument("--keys", type=int, default=4, help="distinct private keys to sign with")
+    parser.add_argument("--mix", type=float, nargs=3, default=(1, 1, 1),
+                        metavar=("SIGN", "VERIFY", "PUBKEY"), help="relative weight of each request type")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
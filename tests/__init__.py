@@ -0,0 +1,4 @@
+import os
+
+# keep the test suite away from the user's precompute cache
+os.environ["PY_BITCOIN_CACHE_DIR"] = ""
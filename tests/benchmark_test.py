@@ -0,0 +1,64 @@
+from tests.generic_test import GenericTest
+from benchmarks import suite
+from benchmarks.__main__ import main
+
+import copy
+import os
+import tempfile
+import unittest
+
+
+class BenchmarkSuiteTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(BenchmarkSuiteTest, self).__init__(*args, **kwargs)
+
+    def test_run(self):
+        results = suite.run(pattern=r"^(field\.add|signature\.)", repeat=2, number=10)
+        self.assertEqual(set(results["benchmarks"]), {"field.add", "signature.der", "signature.parse"})
+        for stats in results["benchmarks"].values():
+            self.assertGreater(stats["median"], 0)
+            self.assertEqual((stats["number"], stats["repeat"]), (10, 2))
+        self.assertEqual(results["format"], suite.FORMAT_VERSION)
+        self.logger.info("Benchmark run test passed!")
+
+    def test_compare(self):
+        baseline = {
+            "format": suite.FORMAT_VERSION,
+            "benchmarks": {
+                "a": {"median": 1.0},
+                "b": {"median": 1.0},
+                "gone": {"median": 1.0},
+            },
+        }
+        results = copy.deepcopy(baseline)
+        del results["benchmarks"]["gone"]
+        results["benchmarks"]["a"]["median"] = 1.05
+        results["benchmarks"]["b"]["median"] = 1.5
+        results["benchmarks"]["new"] = {"median": 1.0}
+
+        rows = {row[0]: row for row in suite.compare(results, baseline, threshold=0.10)}
+        self.assertEqual(set(rows), {"a", "b"})
+        self.assertFalse(rows["a"][4])
+        self.assertTrue(rows["b"][4])
+        rows = {row[0]: row for row in suite.compare(results, baseline, threshold=0.10, thresholds={"b": 0.6})}
+        self.assertFalse(rows["b"][4])
+
+        with self.assertRaises(ValueError):
+            suite.compare(results, {"format": 0, "benchmarks": {}})
+        self.logger.info("Benchmark comparison test passed!")
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.json")
+            arguments = ["run", "-k", "utils.hash160", "--repeat", "2", "--number", "10", "-o", path]
+            self.assertEqual(main(arguments), 0)
+            baseline = suite.load(path)
+            baseline["benchmarks"]["utils.hash160"]["median"] /= 100
+            suite.save(baseline, path)
+            self.assertEqual(main(["compare", path, path]), 0)
+            self.assertEqual(main(arguments[:-2] + ["--baseline", path]), 1)
+        self.logger.info("Benchmark CLI test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
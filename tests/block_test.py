@@ -0,0 +1,100 @@
+from tests.generic_test import GenericTest
+from bitcoin.block import (
+    REGTEST_MAX_TARGET, RETARGET_INTERVAL, BlockHeader, bits_to_target, calculate_new_bits,
+    target_to_bits, validate_header_file,
+)
+from bitcoin.network import HeadersMessage
+
+import os
+import tempfile
+import unittest
+
+GENESIS = "0100000000000000000000000000000000000000000000000000000000000000000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa4b1e5e4a29ab5f49ffff001d1dac2b7c"
+BLOCK_1 = "010000006fe28c0ab6f1b372c1a6a246ae63f74f931e8365e15a089c68d6190000000000982051fd1e4ba744bbbe680e1fee14677ba1a3c3540bf7b1cdb606e857233e0e61bc6649ffff001d01e36299"
+
+
+def mine_chain(count, bits=0x207fffff, spacing=600):
+    """Regtest-difficulty chain following the mainnet retarget rule"""
+    headers = []
+    prev_block = b"\x00" * 32
+    for height in range(count):
+        if height and height % RETARGET_INTERVAL == 0:
+            time_differential = headers[-1].timestamp - headers[-RETARGET_INTERVAL].timestamp
+            bits = calculate_new_bits(bits, time_differential, REGTEST_MAX_TARGET)
+        header = BlockHeader(1, prev_block, height.to_bytes(32, "big"), 1231006505 + spacing * height, bits, 0)
+        while not header.check_pow():
+            header.nonce += 1
+        headers.append(header)
+        prev_block = header.hash()
+    return headers
+
+
+class BlockTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(BlockTest, self).__init__(*args, **kwargs)
+
+    def test_parse(self):
+        genesis = BlockHeader.parse(bytes.fromhex(GENESIS))
+        self.assertEqual(genesis.hash().hex(), "000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f")
+        self.assertEqual(genesis.serialize().hex(), GENESIS)
+        self.assertTrue(genesis.check_pow())
+        self.assertEqual(genesis.difficulty(), 1)
+
+        block_1 = BlockHeader.parse(bytes.fromhex(BLOCK_1))
+        self.assertEqual(block_1.prev_block, genesis.hash())
+        self.assertTrue(block_1.check_pow())
+
+        message = HeadersMessage([bytes.fromhex(GENESIS), bytes.fromhex(BLOCK_1)])
+        parsed = HeadersMessage.parse(message.serialize()).block_headers()
+        self.assertEqual([header.hash() for header in parsed], [genesis.hash(), block_1.hash()])
+        self.logger.info("Block header parsing test passed!")
+
+    def test_bits(self):
+        self.assertEqual(bits_to_target(0x1d00ffff), 0xffff * 256 ** 26)
+        for bits in (0x1d00ffff, 0x17761500, 0x207fffff, 0x03123456):
+            self.assertEqual(target_to_bits(bits_to_target(bits)), bits)
+        self.assertEqual(calculate_new_bits(0x1801d854, 302400), 0x17761500)
+        # clamped to a factor 4 and to the proof-of-work limit
+        self.assertEqual(calculate_new_bits(0x1801d854, 1), 0x17761500)
+        self.assertEqual(calculate_new_bits(0x1d00ffff, 10 ** 9), 0x1d00ffff)
+        self.logger.info("Bits and difficulty adjustment test passed!")
+
+    def test_validate_header_file(self):
+        headers = mine_chain(RETARGET_INTERVAL + 100)
+        self.assertNotEqual(headers[RETARGET_INTERVAL].bits, headers[0].bits)
+        raw = b"".join(header.serialize() for header in headers)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "headers.dat")
+            with open(path, "wb") as f:
+                f.write(raw)
+            report = validate_header_file(path, processes=2, chunk_size=500, max_target=REGTEST_MAX_TARGET)
+            self.assertEqual(report.count, len(headers))
+            self.assertEqual(report.tip, headers[-1].hash())
+            self.assertGreater(report.headers_per_second, 0)
+
+            # broken linkage on a chunk boundary and inside a chunk
+            for index in (500, 777):
+                with open(path, "wb") as f:
+                    f.write(raw[:index * 80 + 4] + b"\x00" * 32 + raw[index * 80 + 36:])
+                with self.assertRaisesRegex(ValueError, f"Header {index} "):
+                    validate_header_file(path, chunk_size=500, check_retarget=False, max_target=REGTEST_MAX_TARGET)
+
+            # bits that do not follow the retarget rule
+            tampered = BlockHeader.parse(raw, 10 * 80)
+            tampered.bits = 0x2000ffff
+            with open(path, "wb") as f:
+                f.write(raw[:800] + tampered.serialize() + raw[880:])
+            with self.assertRaisesRegex(ValueError, "Header 10 has bits"):
+                validate_header_file(path, max_target=REGTEST_MAX_TARGET)
+
+            # regtest difficulty is above the mainnet proof-of-work limit
+            with open(path, "wb") as f:
+                f.write(raw)
+            with self.assertRaises(ValueError):
+                validate_header_file(path)
+        self.logger.info("Header chain validation test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from tests.generic_test import GenericTest
+from bitcoin.compact_filter import GCSFilter, build_basic_filter, _golomb_rice_decode, _golomb_rice_encode
+from bitcoin.utils import siphash
+
+import random
+import unittest
+
+# coinbase output of the genesis block
+GENESIS_SCRIPT = "4104678afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac"
+TESTNET_GENESIS_HASH = "000000000933ea01ad0ee984209779baaec3ced90fa3f408719526f8d77f4943"
+
+
+class CompactFilterTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(CompactFilterTest, self).__init__(*args, **kwargs)
+
+    def test_siphash(self):
+        key = bytes(range(16))
+        self.assertEqual(siphash(key, b""), 0x726fdb47dd0e0e31)
+        self.assertEqual(siphash(key, bytes(range(8))), 0x93f5f5799a932462)
+        self.assertEqual(siphash(key, bytes(range(15))), 0xa129ca6149be45e5)
+        self.logger.info("SipHash test passed!")
+
+    def test_golomb_rice(self):
+        rng = random.Random(0)
+        for p in (1, 7, 19, 25):
+            values = sorted(set(rng.randrange(1 << (p + 4)) for _ in range(300)))
+            encoded = _golomb_rice_encode(values, p)
+            self.assertEqual(list(_golomb_rice_decode(encoded, len(values), p)), values)
+        self.logger.info("Golomb-Rice coding test passed!")
+
+    def test_truncated_filter(self):
+        key = bytes(16)
+        gcs = GCSFilter.build(key, [bytes([i]) for i in range(100)])
+        serialized = gcs.serialize()
+        for end in (len(serialized) - 1, len(serialized) // 2, 1):
+            with self.assertRaises(ValueError):
+                GCSFilter.parse(serialized[:end], key).hashes()
+        # declared item counts the data cannot hold, ending in padding or in a quotient
+        for data in ("05ff", "0500", "03ffffff", "02" + "ff" * 40):
+            with self.assertRaises(ValueError):
+                GCSFilter.parse(bytes.fromhex(data), key).match_any([b"\x00", b"\x01"])
+        self.assertEqual(GCSFilter.parse(serialized, key).hashes(), gcs.hashes())
+        self.logger.info("Truncated filter test passed!")
+
+    def test_basic_filter(self):
+        # BIP158 test vector: testnet genesis block
+        block_filter = build_basic_filter(
+            bytes.fromhex(TESTNET_GENESIS_HASH),
+            [bytes.fromhex(GENESIS_SCRIPT), b"", b"\x6a\x04test"],
+        )
+        self.assertEqual(block_filter.serialize().hex(), "019dfca8")
+        self.assertEqual(
+            block_filter.header()[::-1].hex(),
+            "21584579b7eb08997773e5aeff3a7f932700042d0ed2a6129012b7d7ae81b750",
+        )
+        self.assertTrue(block_filter.match(bytes.fromhex(GENESIS_SCRIPT)))
+        self.logger.info("Basic filter test passed!")
+
+    def test_hash_collisions(self):
+        # with m = 4 many of the 40 items share a hash value, every one of them is encoded
+        items = [bytes([i]) for i in range(40)]
+        gcs = GCSFilter.build(bytes(16), items, p=2, m=4)
+        self.assertEqual(gcs.n, 40)
+        hashes = gcs.hashes()
+        self.assertEqual(len(hashes), 40)
+        self.assertLess(len(set(hashes)), 40)
+        self.assertEqual(hashes, gcs._hash_items(items))
+        self.assertEqual(bytes(_golomb_rice_encode(hashes, 2)), gcs.data)
+        self.assertTrue(all(gcs.match(item) for item in items))
+        self.logger.info("Hash collision test passed!")
+
+    def test_match_any(self):
+        rng = random.Random(1)
+        key = rng.randbytes(16)
+        items = [rng.randbytes(25) for _ in range(1000)]
+        gcs = GCSFilter.build(key, items + items[:10])
+        self.assertEqual(gcs.n, 1000)
+        parsed = GCSFilter.parse(gcs.serialize(), key)
+        self.assertEqual(parsed.hashes(), gcs.hashes())
+
+        others = [rng.randbytes(25) for _ in range(2000)]
+        self.assertFalse(parsed.match_any(others))
+        self.assertTrue(parsed.match_any(others + [items[500]]))
+        self.assertTrue(parsed.match_any([items[0]]))
+        self.assertTrue(all(parsed.match(item) for item in items[::50]))
+        self.assertFalse(parsed.match_any([]))
+        self.assertFalse(GCSFilter.build(key, []).match_any(items))
+        self.logger.info("Filter matching test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+from tests.generic_test import GenericTest
+from bitcoin import FieldElement, Point, PrivateKey, S256Field, S256Point, Signature
+from bitcoin import metrics
+
+import unittest
+
+
+class MetricsTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(MetricsTest, self).__init__(*args, **kwargs)
+
+    def test_field_counters(self):
+        a = FieldElement(7, 223)
+        b = FieldElement(12, 223)
+        with metrics.collect() as m:
+            a * b
+            3 * a
+            a ** 2
+            a ** 5
+            a / b
+            S256Field(4).sqrt()
+        counters = m.to_dict()["counters"]
+        self.assertEqual(counters["field_mul"], 3)
+        self.assertEqual(counters["field_square"], 1)
+        self.assertEqual(counters["field_pow"], 1)
+        self.assertEqual(counters["field_inversion"], 1)
+        self.assertEqual(counters["field_sqrt"], 1)
+        self.logger.info("Field counters test passed!")
+
+    def test_point_counters_and_timings(self):
+        a = FieldElement(0, 223)
+        b = FieldElement(7, 223)
+        p1 = Point(FieldElement(192, 223), FieldElement(105, 223), a, b)
+        p2 = Point(FieldElement(17, 223), FieldElement(56, 223), a, b)
+        priv = PrivateKey(secret_key=12345)
+        pub_key = priv.pub_key
+        sig = priv.sign(42)
+
+        with metrics.collect() as outer:
+            p1 + p2
+            p1 + p1
+            with metrics.collect() as inner:
+                self.assertTrue(pub_key.verify(42, sig))
+                S256Point.parse(pub_key.sec())
+                Signature.parse(sig.der())
+        self.assertEqual(outer.counters["point_add"] - inner.counters["point_add"], 1)
+        self.assertEqual(outer.counters["point_double"] - inner.counters["point_double"], 1)
+        self.assertGreater(inner.counters["point_check"], 0)
+        self.assertEqual(inner.counters["scalar_inversion"], 1)
+        self.assertGreater(inner.counters["field_inversion"], 0)
+        self.assertEqual(set(inner.timings), {"S256Point.verify", "S256Point.parse", "Signature.parse"})
+        self.assertEqual(inner.timings["S256Point.verify"]["count"], 1)
+
+        text = inner.to_prometheus()
+        self.assertIn("py_bitcoin_field_inversion_total ", text)
+        self.assertIn('py_bitcoin_call_duration_seconds_count{call="S256Point.verify"} 1', text)
+        self.logger.info("Point counters and timings test passed!")
+
+    def test_sign_counters(self):
+        priv = PrivateKey(secret_key=12345)
+        with metrics.collect() as m:
+            sig = priv.sign(42)
+        # the nonce inversion, and one addition per nonzero 4 bit window after the first
+        self.assertEqual(m.counters["scalar_inversion"], 1)
+        self.assertEqual(m.counters["field_inversion"], 0)
+        self.assertGreater(m.counters["point_add"], 0)
+        self.assertEqual(m.counters["batch_inversion"], m.counters["point_add"])
+
+        with metrics.collect() as m:
+            priv.sign_many([1, 2, 3])
+        self.assertEqual(m.counters["scalar_inversion"], 0)
+        self.assertGreater(m.counters["point_add"], 3)
+        self.assertEqual(m.counters["batch_inverted_values"] - 3, m.counters["point_add"])
+        self.assertTrue(priv.pub_key.verify(42, sig))
+        self.logger.info("Sign counters test passed!")
+
+    def test_disabled(self):
+        originals = (FieldElement.__mul__, Point.__add__, S256Point.__dict__["parse"], PrivateKey.sign)
+        with metrics.collect() as m:
+            self.assertIsNot(FieldElement.__mul__, originals[0])
+        self.assertEqual(
+            (FieldElement.__mul__, Point.__add__, S256Point.__dict__["parse"], PrivateKey.sign),
+            originals,
+        )
+        FieldElement(1, 13) * FieldElement(2, 13)
+        self.assertEqual(m.counters["field_mul"], 0)
+        self.logger.info("Disabled metrics test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
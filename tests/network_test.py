@@ -0,0 +1,200 @@
+from tests.generic_test import GenericTest
+from bitcoin.network import (
+    MSG_BLOCK, MSG_FILTERED_BLOCK, MSG_TX, REGTEST_MAGIC, GetDataMessage, GetHeadersMessage, HeadersMessage, InvMessage,
+    NetworkEnvelope, NotFoundMessage, Peer, PingMessage, PongMessage, VerAckMessage,
+    VersionMessage, connect_many,
+)
+from bitcoin.utils import encode_varint, hash256, parse_varint
+
+import asyncio
+import unittest
+
+
+class StandInPeer:
+    """Minimal in-process node answering the messages the Peer class sends"""
+    def __init__(self, magic=REGTEST_MAGIC, headers=None, missing=(), silent=()):
+        self.magic = magic
+        self.headers = headers or []
+        self.missing = set(missing)
+        self.silent = set(silent)
+        self.getdata_messages = 0
+
+    @staticmethod
+    def block_payload(identifier):
+        return b"block:" + identifier
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def send(self, writer, message, command=None):
+        payload = message if command else message.serialize()
+        command = command or message.command
+        writer.write(NetworkEnvelope(command, payload, self.magic).serialize())
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                envelope = await NetworkEnvelope.read(reader, self.magic)
+                if envelope.command == b"version":
+                    self.send(writer, VersionMessage(user_agent=b"/stand-in/"))
+                    self.send(writer, VerAckMessage())
+                    # unsolicited ping, the client has to answer it on its own
+                    self.send(writer, PingMessage(7))
+                elif envelope.command == b"ping":
+                    self.send(writer, PongMessage(PingMessage.parse(envelope.payload).nonce))
+                elif envelope.command == b"getheaders":
+                    GetHeadersMessage.parse(envelope.payload)
+                    self.send(writer, HeadersMessage(self.headers))
+                elif envelope.command == b"getdata":
+                    self.getdata_messages += 1
+                    not_found = NotFoundMessage()
+                    for inv_type, identifier in GetDataMessage.parse(envelope.payload).items:
+                        if identifier in self.missing:
+                            not_found.add(inv_type, identifier)
+                        elif identifier in self.silent:
+                            pass
+                        elif inv_type == MSG_FILTERED_BLOCK:
+                            # a merkleblock then the two transactions it matched
+                            self.send(writer, self.block_payload(identifier), command=b"merkleblock")
+                            self.send(writer, b"tx1:" + identifier, command=b"tx")
+                            self.send(writer, b"tx2:" + identifier, command=b"tx")
+                        else:
+                            self.send(writer, self.block_payload(identifier), command=b"block")
+                    if not_found.items:
+                        self.send(writer, not_found)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class NetworkTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(NetworkTest, self).__init__(*args, **kwargs)
+
+    def test_varint(self):
+        for value in (0, 0xfc, 0xfd, 0xffff, 0x10000, 0xffffffff, 0x100000000):
+            encoded = encode_varint(value)
+            self.assertEqual(parse_varint(memoryview(b"\x00" + encoded), 1), (value, len(encoded) + 1))
+        self.logger.info("Varint test passed!")
+
+    def test_envelope(self):
+        raw = bytes.fromhex("f9beb4d976657261636b000000000000000000005df6e0e2")
+        envelope = NetworkEnvelope.parse(raw)
+        self.assertEqual(envelope.command, b"verack")
+        self.assertEqual(bytes(envelope.payload), b"")
+        self.assertEqual(envelope.serialize(), raw)
+
+        with self.assertRaises(ValueError):
+            NetworkEnvelope.parse(raw[:-1] + b"\x00")
+        with self.assertRaises(ValueError):
+            NetworkEnvelope.parse(raw, magic=REGTEST_MAGIC)
+        self.logger.info("Network envelope test passed!")
+
+    def test_messages(self):
+        version = VersionMessage(timestamp=0, nonce=1, receiver_ip=b"\x7f\x00\x00\x01", latest_block=5)
+        parsed = VersionMessage.parse(version.serialize())
+        self.assertEqual(parsed.serialize(), version.serialize())
+        self.assertEqual(parsed.receiver_ip, b"\x7f\x00\x00\x01")
+        self.assertEqual(parsed.latest_block, 5)
+
+        items = [(MSG_BLOCK, hash256(bytes([i]))) for i in range(3)]
+        self.assertEqual(InvMessage.parse(GetDataMessage(items).serialize()).items, items)
+
+        getheaders = GetHeadersMessage(locator=[b"\x01" * 32, b"\x02" * 32])
+        self.assertEqual(GetHeadersMessage.parse(getheaders.serialize()).locator, getheaders.locator)
+
+        headers = HeadersMessage([bytes(80), b"\x01" * 80])
+        parsed_headers = HeadersMessage.parse(headers.serialize()).headers
+        self.assertEqual([bytes(header) for header in parsed_headers], headers.headers)
+
+        # truncated payloads from a peer are rejected with ValueError, never IndexError
+        for message in (version, GetDataMessage(items), getheaders, headers, PingMessage(1)):
+            serialized = message.serialize()
+            for end in range(len(serialized)):
+                if isinstance(message, VersionMessage) and end == len(serialized) - 1:
+                    continue  # the relay flag is optional
+                with self.assertRaises(ValueError):
+                    type(message).parse(serialized[:end])
+        with self.assertRaises(ValueError):
+            HeadersMessage.parse(b"\xfd\x01")
+        self.logger.info("Network messages test passed!")
+
+    def test_peer(self):
+        headers = [bytes([i]) * 80 for i in range(10)]
+        items = [(MSG_BLOCK, hash256(i.to_bytes(4, "little"))) for i in range(500)]
+        missing = {items[3][1], items[250][1]}
+
+        async def scenario():
+            stand_in = StandInPeer(headers=headers, missing=missing)
+            port = await stand_in.start()
+            peer = await Peer.connect("127.0.0.1", port, magic=REGTEST_MAGIC)
+            await peer.handshake()
+            self.assertEqual(peer.remote_version.user_agent, b"/stand-in/")
+            self.assertGreaterEqual(await peer.ping(), 0)
+
+            received = await peer.get_headers([b"\x00" * 32])
+            self.assertEqual([bytes(header) for header in received.headers], headers)
+
+            blocks = await peer.get_data(items, window=100, batch=25)
+            expected = [StandInPeer.block_payload(h) for _, h in items if h not in missing]
+            self.assertEqual([bytes(envelope.payload) for envelope in blocks], expected)
+            self.assertEqual(stand_in.getdata_messages, 20)
+            await peer.close()
+            await stand_in.close()
+
+        asyncio.run(scenario())
+        self.logger.info("Peer test passed!")
+
+    def test_get_data_options(self):
+        blocks = [(MSG_FILTERED_BLOCK, hash256(bytes([i]))) for i in range(10)]
+
+        async def scenario():
+            stand_in = StandInPeer(silent={blocks[9][1]})
+            port = await stand_in.start()
+            peer = await Peer.connect("127.0.0.1", port, magic=REGTEST_MAGIC)
+            await peer.handshake()
+
+            received = await peer.get_data(blocks[:9], window=4, batch=2, timeout=5)
+            self.assertEqual([envelope.command for envelope in received], [b"merkleblock", b"tx", b"tx"] * 9)
+            self.assertEqual(bytes(received[-1].payload), b"tx2:" + blocks[8][1])
+
+            with self.assertRaises(asyncio.TimeoutError):
+                await peer.get_data(blocks[9:], timeout=0.2)
+            for window, batch in ((0, 1), (1, 0), (4, -1)):
+                with self.assertRaises(ValueError):
+                    await peer.get_data(blocks, window=window, batch=batch)
+            with self.assertRaises(ValueError):
+                await peer.get_data(blocks + [(MSG_TX, hash256(b"tx"))])
+            await peer.close()
+            await stand_in.close()
+
+        asyncio.run(scenario())
+        self.logger.info("Get data options test passed!")
+
+    def test_many_peers(self):
+        async def scenario():
+            stand_ins = [StandInPeer() for _ in range(20)]
+            ports = [await stand_in.start() for stand_in in stand_ins]
+            addresses = [("127.0.0.1", port) for port in ports] + [("127.0.0.1", 1)]
+            peers = await connect_many(addresses, magic=REGTEST_MAGIC, timeout=5)
+            self.assertEqual(len(peers), 20)
+            pings = await asyncio.gather(*(peer.ping() for peer in peers))
+            self.assertEqual(len(pings), 20)
+            for peer in peers:
+                await peer.close()
+            for stand_in in stand_ins:
+                await stand_in.close()
+
+        asyncio.run(scenario())
+        self.logger.info("Many peers test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
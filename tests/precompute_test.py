@@ -0,0 +1,88 @@
+from tests.generic_test import GenericTest
+from bitcoin import precompute, secp256k1
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+class PrecomputeTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(PrecomputeTest, self).__init__(*args, **kwargs)
+
+    def test_store_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(os.environ, {"PY_BITCOIN_CACHE_DIR": directory}):
+                self.assertIsNone(precompute.load("table", 1))
+                path = precompute.store("table", 1, b"\x01\x02" * 100)
+                self.assertEqual(path, os.path.join(directory, "table-v1.bin"))
+                self.assertEqual(bytes(precompute.load("table", 1)), b"\x01\x02" * 100)
+                self.assertIsNone(precompute.load("table", 2))
+
+                with open(path, "r+b") as f:
+                    f.seek(-1, os.SEEK_END)
+                    f.write(b"\xff")
+                self.assertIsNone(precompute.load("table", 1))
+
+            with mock.patch.dict(os.environ, {"PY_BITCOIN_CACHE_DIR": ""}):
+                self.assertIsNone(precompute.store("table", 1, b"data"))
+                self.assertIsNone(precompute.load("table", 1))
+        self.logger.info("Precompute cache test passed!")
+
+    def test_generator_table(self):
+        table = secp256k1._build_generator_table()
+        self.assertEqual(len(table), 64 * 15)
+        self.assertEqual(secp256k1._generator_table(), table)
+        with tempfile.TemporaryDirectory() as directory:
+            with mock.patch.dict(os.environ, {"PY_BITCOIN_CACHE_DIR": directory}), \
+                    mock.patch.object(secp256k1, "_G_TABLE", None):
+                self.assertEqual(secp256k1._generator_table(), table)
+                self.assertTrue(os.listdir(directory))
+                secp256k1._G_TABLE = None
+                with mock.patch.object(secp256k1, "_build_generator_table") as build:
+                    self.assertEqual(secp256k1._generator_table(), table)
+                    build.assert_not_called()
+
+                # a table with a valid checksum but wrong contents is rebuilt
+                wrong = [table[1]] + table[1:]
+                precompute.store(secp256k1._G_TABLE_NAME, secp256k1._G_TABLE_VERSION, b"".join(
+                    x.to_bytes(32, "big") + y.to_bytes(32, "big") for x, y in wrong
+                ))
+                secp256k1._G_TABLE = None
+                self.assertEqual(secp256k1._generator_table(), table)
+                self.assertFalse(secp256k1._check_generator_table(wrong))
+                self.assertFalse(secp256k1._check_generator_table(table[:15] + table[16:31] + table[30:]))
+                # entries inside a window, not only the window bases
+                for i, j in ((1, 2), (20, 21), (958, 959)):
+                    swapped = list(table)
+                    swapped[i], swapped[j] = swapped[j], swapped[i]
+                    self.assertFalse(secp256k1._check_generator_table(swapped))
+                off_by_one = list(table)
+                off_by_one[500] = (table[500][0], table[500][1] + 1)
+                self.assertFalse(secp256k1._check_generator_table(off_by_one))
+                self.assertFalse(secp256k1._check_generator_table(table[:-1]))
+                self.assertTrue(secp256k1._check_generator_table(table))
+        self.logger.info("Generator table cache test passed!")
+
+    def test_lazy_imports(self):
+        code = (
+            "import sys, bitcoin\n"
+            "assert 'bitcoin.secp256k1' not in sys.modules\n"
+            "from bitcoin import FieldElement\n"
+            "assert 'bitcoin.secp256k1' not in sys.modules\n"
+            "assert bitcoin.S256Point.G().x.num\n"
+            "assert bitcoin.watchset.WatchSet\n"
+            "assert 'PrivateKey' in dir(bitcoin)\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.dirname(__file__)))
+        import bitcoin
+        with self.assertRaises(AttributeError):
+            bitcoin.missing
+        self.logger.info("Lazy imports test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+from tests.generic_test import GenericTest
+from bitcoin import PrivateKey, Signature
+from bitcoin.service import SigningClient, SigningServer
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+
+class SigningServiceTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(SigningServiceTest, self).__init__(*args, **kwargs)
+
+    def test_tcp_round_trip(self):
+        async def scenario():
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                server = SigningServer(executor=pool, batch_window=0.01)
+                listener = await server.start_tcp("127.0.0.1", 0)
+                port = listener.sockets[0].getsockname()[1]
+                client = await SigningClient.open_tcp("127.0.0.1", port)
+                priv = PrivateKey(secret_key=12345)
+                zs = list(range(1, 21))
+
+                signatures = await asyncio.gather(*(client.sign(priv.secret_key, z) for z in zs))
+                self.assertEqual(signatures, priv.sign_many(zs))
+                pub_key = await client.pub_key(priv.secret_key)
+                self.assertEqual(pub_key, priv.pub_key)
+                self.assertTrue(await client.verify(pub_key, 1, signatures[0]))
+                self.assertFalse(await client.verify(pub_key, 2, signatures[0]))
+                with self.assertRaises(ValueError):
+                    await client.sign(0, 1)
+
+                metrics = await client.metrics()
+                self.assertEqual(metrics["responses"], len(zs) + 4)
+                self.assertEqual(metrics["errors"], 1)
+                self.assertLess(metrics["batches"], metrics["responses"])
+                await client.close()
+                await server.close()
+
+        asyncio.run(scenario())
+        self.logger.info("Signing service TCP test passed!")
+
+    def test_unix_socket(self):
+        async def scenario(path):
+            with ProcessPoolExecutor(max_workers=1) as pool:
+                server = SigningServer(executor=pool)
+                await server.start_unix(path)
+                client = await SigningClient.open_unix(path)
+                priv = PrivateKey(secret_key=5003)
+                sig = await client.sign(priv.secret_key, 42)
+                self.assertIsInstance(sig, Signature)
+                self.assertTrue(priv.pub_key.verify(42, sig))
+                await client.close()
+                await server.close()
+
+        with tempfile.TemporaryDirectory() as directory:
+            asyncio.run(scenario(os.path.join(directory, "signer.sock")))
+        self.logger.info("Signing service Unix socket test passed!")
+
+    def test_close(self):
+        async def scenario():
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                # a window long enough for requests to still be queued at close
+                server = SigningServer(executor=pool, batch_window=60)
+                listener = await server.start_tcp("127.0.0.1", 0)
+                port = listener.sockets[0].getsockname()[1]
+                idle = await SigningClient.open_tcp("127.0.0.1", port)
+                self.assertEqual((await idle.metrics())["connections"], 1)
+                client = await SigningClient.open_tcp("127.0.0.1", port)
+                queued = asyncio.ensure_future(client.sign(12345, 1))
+                while not server._queue:
+                    await asyncio.sleep(0.01)
+
+                await server.close()
+                with self.assertRaisesRegex(ValueError, "Server closed"):
+                    await queued
+                self.assertFalse(server._connections)
+                self.assertIsNone(server._flush_handle)
+                # the server hung up on the idle connection too
+                await asyncio.wait_for(idle._reading, 5)
+                with self.assertRaises(ConnectionError):
+                    await idle.metrics()
+                await client.close()
+                await idle.close()
+
+        with self.assertNoLogs("asyncio", level="ERROR"):
+            asyncio.run(scenario())
+        self.logger.info("Signing service close test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+from tests.generic_test import GenericTest
+from bitcoin import PrivateKey, S256Point, Signature
+from bitcoin.utils import batch_inverse
+
+import copy
+import pickle
+import unittest
+
+
+class SigningTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(SigningTest, self).__init__(*args, **kwargs)
+
+    def test_batch_inverse(self):
+        values = [3, 7, 11, 222]
+        inverses = batch_inverse(values, 223)
+        for value, inverse in zip(values, inverses):
+            self.assertEqual(value * inverse % 223, 1)
+        with self.assertRaises(ValueError):
+            batch_inverse([3, 223], 223)
+        self.logger.info("Batch inverse test passed!")
+
+    def test_base_mul(self):
+        for k in (1, 2, 0xdeadbeef, S256Point.N - 1):
+            self.assertEqual(S256Point.base_mul(k), k * S256Point.G())
+        self.assertTrue(S256Point.base_mul(0).is_infinity)
+        self.assertTrue(S256Point.base_mul(S256Point.N).is_infinity)
+        self.logger.info("Fixed base multiplication test passed!")
+
+    def test_sign(self):
+        priv = PrivateKey(secret_key=12345)
+        z = 0xec208baa0fc1c19f708a9ca96fdeff3ac3f230bb4a7ba4aede4942ad003c0f60
+        sig = priv.sign(z)
+        self.assertTrue(priv.pub_key.verify(z, sig))
+        self.assertEqual(sig, priv.sign(z))
+
+        # keys stay picklable after signing, e.g. to be sent to worker processes
+        for clone in (pickle.loads(pickle.dumps(priv)), copy.deepcopy(priv)):
+            self.assertEqual(clone.secret_key, priv.secret_key)
+            self.assertEqual(clone.sign(z), sig)
+        self.assertIsNotNone(priv._nonce_state)
+        self.logger.info("Signing test passed!")
+
+    def test_sign_many(self):
+        priv = PrivateKey(secret_key=2021**5)
+        zs = [1, 2, 0xdeadbeef, 2**256 - 5] + list(range(1000, 1010))
+        signatures = priv.sign_many(zs)
+        self.assertEqual(signatures, [priv.sign(z) for z in zs])
+        for z, sig in zip(zs, signatures):
+            self.assertTrue(priv.pub_key.verify(z, sig))
+        self.assertEqual(priv.sign_many(zs, processes=2), signatures)
+        self.assertEqual(priv.sign_many([]), [])
+        self.logger.info("Bulk signing test passed!")
+
+    def test_signature_parse(self):
+        der = bytes.fromhex(
+            "3045022037206a0610995c58074999cb9767b87af4c4978db68c06e8e6e81d282047a7c6"
+            "0221008ca63759c1157ebeaec0d03cecca119fc9a75bf8e6d0fa65c841c8e2738cdaec"
+        )
+        sig = Signature.parse(der)
+        self.assertEqual(sig.r, 0x37206a0610995c58074999cb9767b87af4c4978db68c06e8e6e81d282047a7c6)
+        self.assertEqual(sig.s, 0x8ca63759c1157ebeaec0d03cecca119fc9a75bf8e6d0fa65c841c8e2738cdaec)
+        self.assertEqual(sig.der(), der)
+
+        # values whose bytes start like DER markers, with and without the 33rd padding byte
+        for r, s in (
+            (0x30 << 248 | 0x0230, 0x02 << 248 | 0x3002),
+            (0x0230 << 240 | 1, 0x3045 << 240 | 2),
+            (0xff << 248 | 0x30, 0x80 << 248 | 0x02),
+            (0x30, 0x02),
+        ):
+            sig = Signature(r, s)
+            self.assertEqual(Signature.parse(sig.der()), sig)
+        self.assertEqual(len(Signature(0x80 << 248, 0x80 << 248).der()), 72)
+
+        malformed = {
+            "missing DER sequence marker": b"\x31" + der[1:],
+            "wrong length": der + b"\x00",
+            "missing DER integer marker": der[:2] + b"\x03" + der[3:],
+            "integer length overruns the signature": der[:3] + b"\x44" + der[4:],
+            "trailing bytes": der[:1] + bytes([der[1] + 1]) + der[2:] + b"\x00",
+        }
+        for reason, der_bin in malformed.items():
+            with self.assertRaisesRegex(ValueError, reason):
+                Signature.parse(der_bin)
+        with self.assertRaisesRegex(ValueError, "missing DER integer marker"):
+            Signature.parse(der[:36] + b"\x03" + der[37:])
+        with self.assertRaisesRegex(ValueError, "missing DER sequence marker"):
+            Signature.parse(der[:7])
+        self.logger.info("Signature parsing test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()
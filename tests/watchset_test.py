@@ -0,0 +1,103 @@
+from tests.generic_test import GenericTest
+from bitcoin import PrivateKey
+from bitcoin.utils import decode_base58, decode_base58_checksum, encode_base58
+from bitcoin import watchset
+from bitcoin.watchset import WatchSet, extract_hash160
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+
+class WatchSetTest(GenericTest):
+    def __init__(self, *args, **kwargs):
+        super(WatchSetTest, self).__init__(*args, **kwargs)
+
+    def test_base58_decoding(self):
+        raw = bytes.fromhex("00007c076ff316692a3d7eb3c3bb0f8b1488cf")
+        self.assertEqual(decode_base58(encode_base58(raw)), raw)
+        priv = PrivateKey(secret_key=0x12345deadbeef)
+        self.assertEqual(decode_base58_checksum(priv.address()), b"\x00" + priv.pub_key.hash160())
+        with self.assertRaises(ValueError):
+            decode_base58_checksum(priv.address()[:-1] + "2")
+        with self.assertRaises(ValueError):
+            decode_base58("0OIl")
+        self.logger.info("Base58 decoding test passed!")
+
+    def test_extract_hash160(self):
+        h160 = bytes(range(20))
+        self.assertEqual(extract_hash160(b"\x76\xa9\x14" + h160 + b"\x88\xac"), h160)
+        self.assertEqual(extract_hash160(b"\xa9\x14" + h160 + b"\x87"), h160)
+        self.assertEqual(extract_hash160(b"\x00\x14" + h160), h160)
+        self.assertIsNone(extract_hash160(b"\x00\x20" + bytes(32)))
+        self.assertIsNone(extract_hash160(b"\x6a\x04test"))
+        self.logger.info("Script hash160 extraction test passed!")
+
+    def test_contains(self):
+        rng = random.Random(0)
+        watched = [rng.randbytes(20) for _ in range(2000)]
+        others = [rng.randbytes(20) for _ in range(2000)]
+        queries = others + watched[::7]
+        rng.shuffle(queries)
+        expected = [query in set(watched) for query in queries]
+
+        for false_positive_rate in (0.01, None):
+            watch_set = WatchSet.from_hash160s(watched + watched[:10], false_positive_rate)
+            self.assertEqual(len(watch_set), 2000)
+            self.assertEqual(watch_set.contains_many(queries), expected)
+            self.assertEqual([query in watch_set for query in queries], expected)
+        self.assertEqual(WatchSet.from_hash160s([]).contains_many(queries), [False] * len(queries))
+
+        keys = [PrivateKey(secret_key=secret) for secret in (5002, 2020**5, 0x12345deadbeef)]
+        watch_set = WatchSet.from_addresses([key.address() for key in keys[:2]])
+        self.assertEqual(
+            watch_set.contains_many([key.pub_key.hash160() for key in keys]),
+            [True, True, False],
+        )
+        self.logger.info("Watch set lookup test passed!")
+
+    def test_sorted_runs(self):
+        rng = random.Random(2)
+        watched = [rng.randbytes(20) for _ in range(100)]
+        hash160s = watched + watched[::3] + [bytearray(h160) for h160 in watched[::5]]
+        rng.shuffle(hash160s)
+        # many small runs, with duplicates inside and across them
+        with mock.patch.object(watchset, "_RUN_SIZE", 7):
+            watch_set = WatchSet.from_hash160s(iter(hash160s))
+        self.assertEqual(len(watch_set), 100)
+        self.assertEqual(bytes(watch_set._data), b"".join(sorted(watched)))
+        self.assertTrue(all(h160 in watch_set for h160 in watched))
+        with self.assertRaises(ValueError):
+            WatchSet.from_hash160s(watched + [bytes(19)])
+        self.logger.info("Sorted runs test passed!")
+
+    def test_match_outputs_and_mmap(self):
+        rng = random.Random(1)
+        watched = [rng.randbytes(20) for _ in range(500)]
+        scripts = [
+            b"\x76\xa9\x14" + watched[3] + b"\x88\xac",
+            b"\x76\xa9\x14" + rng.randbytes(20) + b"\x88\xac",
+            b"\x6a\x04test",
+            b"\x00\x14" + watched[42],
+            b"\xa9\x14" + rng.randbytes(20) + b"\x87",
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "watched.set")
+            WatchSet.from_hash160s(watched).save(path)
+            with WatchSet.load(path) as watch_set:
+                self.assertEqual(len(watch_set), 500)
+                matches = list(watch_set.match_outputs(iter(scripts), batch_size=2))
+                self.assertEqual([(index, h160) for index, _, h160 in matches], [(0, watched[3]), (3, watched[42])])
+                self.assertTrue(all(watch_set.contains_many(watched)))
+
+            with open(path, "r+b") as f:
+                f.truncate(os.path.getsize(path) - 1)
+            with self.assertRaises(ValueError):
+                WatchSet.load(path)
+        self.logger.info("Output matching and memory-mapped set test passed!")
+
+
+if __name__ == '__main__':
+    unittest.main()